@@ -0,0 +1,58 @@
+"""Add trigram search indexes to Master
+
+Revision ID: 4f2c8e1a9b7d
+Revises: dbe7367ac1a4
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f2c8e1a9b7d'
+down_revision: Union[str, Sequence[str], None] = 'dbe7367ac1a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns searched with ILIKE '%term%' by the marketing router
+SEARCH_COLUMNS = ['client_name', 'project_name', 'show_code', 'brand', 'client_code']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm GIN indexes are Postgres-only; other dialects keep scanning.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # CONCURRENTLY cannot run inside a transaction; build without locking writes.
+    with op.get_context().autocommit_block():
+        for column in SEARCH_COLUMNS:
+            op.create_index(
+                f'ix_master_{column}_trgm',
+                'master',
+                [column],
+                unique=False,
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        for column in SEARCH_COLUMNS:
+            op.drop_index(
+                f'ix_master_{column}_trgm',
+                table_name='master',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
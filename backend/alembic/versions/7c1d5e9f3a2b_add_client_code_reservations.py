@@ -0,0 +1,40 @@
+"""Add client_code_reservations
+
+Revision ID: 7c1d5e9f3a2b
+Revises: 4f2c8e1a9b7d
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1d5e9f3a2b'
+down_revision: Union[str, Sequence[str], None] = '4f2c8e1a9b7d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('client_code_reservations',
+    sa.Column('client_code', sa.String(), nullable=False),
+    sa.Column('client_name', sa.String(), nullable=False),
+    sa.Column('misc_info', sa.String(), nullable=False),
+    sa.Column('region', sa.String(), nullable=False),
+    sa.Column('territory', sa.String(), nullable=False),
+    sa.Column('reserved_by', sa.String(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('client_code')
+    )
+    op.create_index(op.f('ix_client_code_reservations_expires_at'), 'client_code_reservations', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_client_code_reservations_expires_at'), table_name='client_code_reservations')
+    op.drop_table('client_code_reservations')
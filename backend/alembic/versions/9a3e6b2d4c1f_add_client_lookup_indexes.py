@@ -0,0 +1,49 @@
+"""Add client lookup indexes
+
+Revision ID: 9a3e6b2d4c1f
+Revises: 7c1d5e9f3a2b
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3e6b2d4c1f'
+down_revision: Union[str, Sequence[str], None] = '7c1d5e9f3a2b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction; build without locking writes.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_master_client_name_misc_info_master_id',
+            'master',
+            ['client_name', 'misc_info', 'master_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_clients_client_key',
+            'clients',
+            [sa.text('lower(client_name)'), sa.text('lower(misc_info)')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_clients_client_key', table_name='clients',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_master_client_name_misc_info_master_id', table_name='master',
+                      postgresql_concurrently=True, if_exists=True)
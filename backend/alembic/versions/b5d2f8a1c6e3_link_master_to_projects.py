@@ -0,0 +1,69 @@
+"""Link master rows to projects with a foreign key
+
+Revision ID: b5d2f8a1c6e3
+Revises: 9a3e6b2d4c1f
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d2f8a1c6e3'
+down_revision: Union[str, Sequence[str], None] = '9a3e6b2d4c1f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+# Show codes are matched first; renames that never reached Projects fall back to the name
+BACKFILL_MATCHES = ['show_code', 'project_name']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    postgres = bind.dialect.name == 'postgresql'
+
+    op.add_column('master', sa.Column('project_id', sa.Integer(), nullable=True))
+    if postgres:
+        # NOT VALID skips the full-table check (and its lock); validated after the backfill
+        op.execute(
+            'ALTER TABLE master ADD CONSTRAINT master_project_id_fkey '
+            'FOREIGN KEY (project_id) REFERENCES projects (project_id) NOT VALID'
+        )
+
+    # Backfill in master_id ranges, committing each batch so writers are never blocked for long
+    with op.get_context().autocommit_block():
+        max_id = bind.execute(sa.text('SELECT max(master_id) FROM master')).scalar() or 0
+        for column in BACKFILL_MATCHES:
+            for low in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+                bind.execute(sa.text(
+                    f'UPDATE master SET project_id = projects.project_id FROM projects '
+                    f'WHERE projects.{column} = master.{column} AND master.project_id IS NULL '
+                    f'AND master.master_id >= :low AND master.master_id < :high'
+                ), {'low': low, 'high': low + BACKFILL_BATCH_SIZE})
+
+        if postgres:
+            op.execute('ALTER TABLE master VALIDATE CONSTRAINT master_project_id_fkey')
+        op.create_index(
+            'ix_master_project_id',
+            'master',
+            ['project_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_master_project_id', table_name='master',
+                      postgresql_concurrently=True, if_exists=True)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('master_project_id_fkey', 'master', type_='foreignkey')
+    op.drop_column('master', 'project_id')
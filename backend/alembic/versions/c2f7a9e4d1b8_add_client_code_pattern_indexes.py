@@ -0,0 +1,69 @@
+"""Add client code prefix indexes
+
+Revision ID: c2f7a9e4d1b8
+Revises: a6d4c2e8b1f5
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f7a9e4d1b8'
+down_revision: Union[str, Sequence[str], None] = 'a6d4c2e8b1f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# logic._taken_codes looks up a code's suffixed family with LIKE 'XXX-RT-MI%'. Under a
+# non-C collation the unique btree on client_code can't serve a prefix match;
+# varchar_pattern_ops compares byte-wise, so it can.
+PATTERN_INDEXES = {
+    'ix_clients_client_code_pattern': 'clients',
+    'ix_client_code_reservations_client_code_pattern': 'client_code_reservations',
+}
+
+
+def drop_invalid_index(bind, name: str) -> None:
+    # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind, which
+    # if_not_exists would then skip; drop it so the rerun builds it for real
+    invalid = bind.execute(sa.text(
+        'SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid '
+        'WHERE pg_class.relname = :name AND NOT pg_index.indisvalid'
+    ), {'name': name}).scalar()
+    if invalid:
+        op.drop_index(name, postgresql_concurrently=True, if_exists=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Operator classes are Postgres-only; other dialects keep the plain index.
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    # CONCURRENTLY cannot run inside a transaction; build without locking writes.
+    with op.get_context().autocommit_block():
+        for name, table in PATTERN_INDEXES.items():
+            drop_invalid_index(bind, name)
+            op.create_index(
+                name,
+                table,
+                ['client_code'],
+                unique=False,
+                postgresql_ops={'client_code': 'varchar_pattern_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        for name, table in PATTERN_INDEXES.items():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,125 @@
+"""Link master rows to clients and make the client key unique
+
+Revision ID: e8c4a7d2f9b1
+Revises: b5d2f8a1c6e3
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c4a7d2f9b1'
+down_revision: Union[str, Sequence[str], None] = 'b5d2f8a1c6e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def drop_invalid_index(bind, name: str) -> None:
+    # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind, which
+    # if_not_exists would then skip; drop it so the rerun builds it for real
+    if bind.dialect.name != 'postgresql':
+        return
+    invalid = bind.execute(sa.text(
+        'SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid '
+        'WHERE pg_class.relname = :name AND NOT pg_index.indisvalid'
+    ), {'name': name}).scalar()
+    if invalid:
+        op.drop_index(name, postgresql_concurrently=True, if_exists=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    postgres = bind.dialect.name == 'postgresql'
+
+    # Clients that differ only by case would block the unique key. Merging them changes
+    # project codes, so that is left to an operator rather than done here.
+    duplicates = bind.execute(sa.text(
+        'SELECT lower(client_name), lower(misc_info), count(*) FROM clients '
+        'GROUP BY lower(client_name), lower(misc_info) HAVING count(*) > 1'
+    )).all()
+    if duplicates:
+        listed = ', '.join(f'{name}/{misc_info} ({count})' for name, misc_info, count in duplicates[:20])
+        raise RuntimeError(f'Merge duplicate clients before upgrading: {listed}')
+
+    op.add_column('master', sa.Column('client_id', sa.Integer(), nullable=True))
+    if postgres:
+        # NOT VALID skips the full-table check (and its lock); validated after the backfill
+        op.execute(
+            'ALTER TABLE master ADD CONSTRAINT master_client_id_fkey '
+            'FOREIGN KEY (client_id) REFERENCES clients (client_id) NOT VALID'
+        )
+
+    # Backfill in master_id ranges, committing each batch so writers are never blocked for long
+    with op.get_context().autocommit_block():
+        max_id = bind.execute(sa.text('SELECT max(master_id) FROM master')).scalar() or 0
+        for low in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+            bind.execute(sa.text(
+                'UPDATE master SET client_id = clients.client_id FROM clients '
+                'WHERE clients.client_code = master.client_code AND master.client_id IS NULL '
+                'AND master.master_id >= :low AND master.master_id < :high'
+            ), {'low': low, 'high': low + BACKFILL_BATCH_SIZE})
+
+        if postgres:
+            op.execute('ALTER TABLE master VALIDATE CONSTRAINT master_client_id_fkey')
+
+        # Latest-project lookups now go through client_id
+        drop_invalid_index(bind, 'ix_master_client_id_master_id')
+        op.create_index(
+            'ix_master_client_id_master_id',
+            'master',
+            ['client_id', 'master_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index('ix_master_client_name_misc_info_master_id', table_name='master',
+                      postgresql_concurrently=True, if_exists=True)
+
+        # The lookup index becomes the unique client key. The create path relies on it
+        # for race safety, so a half-built (invalid) one must not count as present.
+        drop_invalid_index(bind, 'uq_clients_client_key')
+        op.create_index(
+            'uq_clients_client_key',
+            'clients',
+            [sa.text('lower(client_name)'), sa.text('lower(misc_info)')],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index('ix_clients_client_key', table_name='clients',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_clients_client_key',
+            'clients',
+            [sa.text('lower(client_name)'), sa.text('lower(misc_info)')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index('uq_clients_client_key', table_name='clients',
+                      postgresql_concurrently=True, if_exists=True)
+        op.create_index(
+            'ix_master_client_name_misc_info_master_id',
+            'master',
+            ['client_name', 'misc_info', 'master_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index('ix_master_client_id_master_id', table_name='master',
+                      postgresql_concurrently=True, if_exists=True)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('master_client_id_fkey', 'master', type_='foreignkey')
+    op.drop_column('master', 'client_id')
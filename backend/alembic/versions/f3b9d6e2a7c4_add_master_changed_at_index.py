@@ -0,0 +1,39 @@
+"""Add master changed_at index
+
+Revision ID: f3b9d6e2a7c4
+Revises: e8c4a7d2f9b1
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9d6e2a7c4'
+down_revision: Union[str, Sequence[str], None] = 'e8c4a7d2f9b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction; build without locking writes.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_master_changed_at',
+            'master',
+            [sa.text('coalesce(updated_at, created_at)')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_master_changed_at', table_name='master',
+                      postgresql_concurrently=True, if_exists=True)
@@ -1,11 +1,24 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
+from uuid import uuid4
 from jose import JWTError, jwt
-import bcrypt
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
 from sqlalchemy.orm import Session
-from . import models, schemas, database
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from . import models, schemas, database, hashing
+
+logger = logging.getLogger(__name__)
 
 # SECRET_KEY should be in env vars. Using a hardcoded one for demo simplicity.
 SECRET_KEY = "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
@@ -14,11 +27,137 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 1440 # 24 hours
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# Verified principals are cached so authenticated requests don't need a users lookup.
+# Entries are dropped when the user row changes (see the listeners below) or after the TTL,
+# which bounds staleness for changes made by other processes.
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "1024"))
+
+class PrincipalCache:
+    """TTL + LRU map of username -> verified Principal."""
+    def __init__(self, ttl_seconds: int, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[schemas.Principal]:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return principal
+
+    def set(self, principal: schemas.Principal):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[principal.username] = (principal, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(principal.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: str):
+        with self._lock:
+            self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_SIZE)
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_principal(mapper, connection, target):
+    # Role change or deletion: the next request re-reads the row
+    principal_cache.invalidate(target.username)
+
+# bcrypt cost factor for new hashes. Logins transparently rehash passwords stored with a different cost.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Login hashing runs in a dedicated process pool so a burst of logins can't starve
+# the event loop or the request threadpool. Once LOGIN_MAX_PENDING hashes are queued
+# or running, further logins are rejected with 503 instead of piling up.
+# LOGIN_HASH_WORKERS=0 falls back to the threadpool.
+LOGIN_HASH_WORKERS = database._env_int("LOGIN_HASH_WORKERS", min(2, os.cpu_count() or 1))
+LOGIN_MAX_PENDING = database._env_int("LOGIN_MAX_PENDING", 4 * max(LOGIN_HASH_WORKERS, 1))
+LOGIN_HASH_NICE = database._env_int("LOGIN_HASH_NICE", 10)
+
+_hash_pool = None
+_hash_pending = 0
+
+def _get_hash_pool():
+    global _hash_pool
+    if _hash_pool is None and LOGIN_HASH_WORKERS > 0:
+        # spawn: forking a process that already runs an event loop and threads is unsafe
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=LOGIN_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=hashing.init_worker,
+            initargs=(LOGIN_HASH_NICE,)
+        )
+    return _hash_pool
+
+def _discard_hash_pool(pool):
+    # A pool whose worker died (OOM kill, segfault) stays broken for good; drop it so the
+    # next login starts a fresh one
+    global _hash_pool
+    if _hash_pool is pool:
+        _hash_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_hash_pool():
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
+async def _run_hashing(fn, *args):
+    global _hash_pending
+    if _hash_pending >= LOGIN_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress. Please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+    _hash_pending += 1
+    try:
+        pool = _get_hash_pool()
+        if pool is None:
+            return await run_in_threadpool(fn, *args)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            logger.exception("Login hashing pool broke; starting a new one")
+            _discard_hash_pool(pool)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Login is temporarily unavailable. Please retry.",
+                headers={"Retry-After": "1"},
+            )
+    finally:
+        _hash_pending -= 1
+
 def verify_password(plain_password, hashed_password):
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return hashing.verify_password(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return hashing.get_password_hash(password, BCRYPT_ROUNDS)
+
+def needs_rehash(hashed_password) -> bool:
+    return hashing.get_hash_rounds(hashed_password) != BCRYPT_ROUNDS
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    return await _run_hashing(hashing.verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password) -> str:
+    return await _run_hashing(hashing.get_password_hash, password, BCRYPT_ROUNDS)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -26,11 +165,14 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+def get_user(db: Session, username: str):
+    return db.query(models.User).filter(models.User.username == username).first()
+
+async def get_current_user(token: str = Depends(oauth2_scheme), runner: database.SessionRunner = Depends(database.get_runner)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -45,12 +187,19 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = schemas.TokenData(username=username, role=role)
     except JWTError:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
+
+    principal = principal_cache.get(token_data.username)
+    if principal is not None:
+        return principal
+
+    user = await runner.run(get_user, token_data.username)
     if user is None:
         raise credentials_exception
-    return user
+    principal = schemas.Principal(username=user.username, role=user.role)
+    principal_cache.set(principal)
+    return principal
 
-async def get_current_marketing_user(current_user: models.User = Depends(get_current_user)):
+async def get_current_marketing_user(current_user: schemas.Principal = Depends(get_current_user)):
     if current_user.role != "marketing":
         raise HTTPException(status_code=403, detail="Not authorized")
     return current_user
@@ -0,0 +1,87 @@
+import bisect
+import os
+import threading
+import time
+from sqlalchemy.orm import Session
+from . import models
+
+# Other workers' inserts only reach this process's index on reload
+CLIENT_INDEX_REFRESH_SECONDS = int(os.getenv("CLIENT_INDEX_REFRESH_SECONDS", "300"))
+
+class ClientIndex:
+    """
+    In-process, case-insensitive sorted index of client names and their misc_infos.
+    Prefix lookups are a bisect plus a scan of the matches, so cost follows the
+    result size rather than the number of clients.
+    """
+    def __init__(self, refresh_seconds: int = CLIENT_INDEX_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._keys = []    # casefolded names, sorted
+        self._names = []   # display names, parallel to _keys
+        self._misc_infos = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def needs_load(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds
+
+    def load(self, db: Session):
+        rows = db.query(models.Client.client_name, models.Client.misc_info).all()
+        misc_infos = {}
+        for client_name, misc_info in rows:
+            misc_infos.setdefault(client_name, set()).add(misc_info)
+        names = sorted(misc_infos, key=lambda n: (n.casefold(), n))
+        with self._lock:
+            self._names = names
+            self._keys = [n.casefold() for n in names]
+            self._misc_infos = misc_infos
+            self._loaded_at = time.monotonic()
+
+    def add(self, client_name: str, misc_info: str):
+        # Called after a commit that may have created a client; a no-op if already known.
+        # Clients match case-insensitively (logic.client_key_filter), so callers may pass
+        # another spelling of a stored client; that must not add a second entry.
+        with self._lock:
+            if self._contains(client_name, misc_info):
+                return
+            if client_name not in self._misc_infos:
+                key = (client_name.casefold(), client_name)
+                index = self._insert_position(key)
+                self._keys.insert(index, key[0])
+                self._names.insert(index, client_name)
+                self._misc_infos[client_name] = set()
+            self._misc_infos[client_name].add(misc_info)
+
+    def _contains(self, client_name: str, misc_info: str) -> bool:
+        key, misc_key = client_name.casefold(), misc_info.casefold()
+        index = bisect.bisect_left(self._keys, key)
+        while index < len(self._keys) and self._keys[index] == key:
+            if any(m.casefold() == misc_key for m in self._misc_infos[self._names[index]]):
+                return True
+            index += 1
+        return False
+
+    def _insert_position(self, key) -> int:
+        # First position with the same casefolded key, then step past smaller exact names
+        index = bisect.bisect_left(self._keys, key[0])
+        while index < len(self._keys) and self._keys[index] == key[0] and self._names[index] < key[1]:
+            index += 1
+        return index
+
+    def search(self, prefix: str, limit: int) -> list:
+        needle = prefix.casefold()
+        with self._lock:
+            start = bisect.bisect_left(self._keys, needle)
+            results = []
+            for index in range(start, len(self._keys)):
+                if len(results) >= limit or not self._keys[index].startswith(needle):
+                    break
+                results.append(self._names[index])
+            return results
+
+    def misc_infos(self, client_name: str) -> list:
+        with self._lock:
+            return sorted(self._misc_infos.get(client_name, ()))
+
+client_index = ClientIndex()
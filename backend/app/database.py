@@ -1,8 +1,12 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
+from starlette.concurrency import run_in_threadpool
+from uuid import uuid4
 import os
+import re
 
 # In a real app, use environment variables. For this demo, we default to the user provided URL.
 # The user can override this by setting DATABASE_URL in their environment.
@@ -18,14 +22,76 @@ if "pooler.supabase.com" in SQLALCHEMY_DATABASE_URL and ":5432" in SQLALCHEMY_DA
     print("⚠️ Detected Supabase Session Pooler (5432). Switching to Transaction Pooler (6543) to fix connection limits.")
     SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace(":5432", ":6543")
 
-# Configure connection pooling to avoid "MaxClientsInSessionMode" errors
-# We use NullPool to disable application-side pooling entirely.
-# This ensures connections are closed immediately after use, preventing idle connections
-# from consuming the limited Supabase slots (especially during deployments).
+# Connection pooling, chosen with DB_POOL_MODE:
+#   "queue"       - sized QueuePool kept warm between requests (default for direct connections).
+#   "transaction" - for transaction poolers such as PgBouncer / Supabase port 6543: a small
+#                   local pool with short overflow and recycle, no server-side prepared
+#                   statements (default when the URL points at port 6543).
+#   "null"        - NullPool, a fresh connection per checkout (the previous behaviour).
+# Reusing connections saves the TCP + TLS + auth handshake, which dominates request latency
+# against a hosted database. Sizes can be tuned with the DB_POOL_* variables below.
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def get_pool_mode(url: str) -> str:
+    mode = os.getenv("DB_POOL_MODE")
+    if mode:
+        mode = mode.strip().lower()
+        if mode not in ("queue", "transaction", "null"):
+            raise ValueError(f"Unsupported DB_POOL_MODE: {mode}")
+        return mode
+    if ":6543" in url:
+        return "transaction"
+    return "queue"
+
+def _is_sqlite_memory(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and (
+        parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory"
+    )
+
+def get_engine_options(url: str) -> dict:
+    mode = get_pool_mode(url)
+    options = {"pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True)}
+    if mode == "null":
+        options["poolclass"] = NullPool
+        return options
+    if _is_sqlite_memory(url):
+        # SQLAlchemy keeps in-memory SQLite on one shared connection (SingletonThreadPool /
+        # StaticPool), which takes no pool sizing arguments
+        return options
+
+    transaction = mode == "transaction"
+    options.update(
+        pool_size=_env_int("DB_POOL_SIZE", 5),
+        max_overflow=_env_int("DB_MAX_OVERFLOW", 2 if transaction else 10),
+        pool_timeout=_env_int("DB_POOL_TIMEOUT", 10 if transaction else 30),
+        # The pooler may close idle server connections on its own schedule; recycle before it does
+        pool_recycle=_env_int("DB_POOL_RECYCLE", 300 if transaction else 1800),
+        # LIFO keeps a few hot connections busy and lets the rest idle out
+        pool_use_lifo=_env_bool("DB_POOL_LIFO", True),
+    )
+    # psycopg2 never uses server-side prepared statements, so it is transaction-pooler safe
+    # as is. asyncpg does: disable its caches and use unique statement names, since the
+    # next transaction may land on a different server connection.
+    if transaction and make_url(url).drivername.endswith("+asyncpg"):
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return options
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    poolclass=NullPool,
-    pool_pre_ping=True
+    **get_engine_options(SQLALCHEMY_DATABASE_URL)
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -37,3 +103,114 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Schema handling at startup, chosen with DB_SCHEMA_MODE:
+#   "check"  - compare the database's Alembic revision with the migration head once and
+#              refuse to start on a mismatch; no table reflection (default off SQLite).
+#   "create" - Base.metadata.create_all, for local SQLite databases the migrations
+#              don't support (default for sqlite URLs).
+#   "skip"   - trust the schema and touch nothing.
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic")
+
+def get_schema_mode(url: str) -> str:
+    mode = os.getenv("DB_SCHEMA_MODE")
+    if mode:
+        mode = mode.strip().lower()
+        if mode not in ("check", "create", "skip"):
+            raise ValueError(f"Unsupported DB_SCHEMA_MODE: {mode}")
+        return mode
+    if make_url(url).get_backend_name() == "sqlite":
+        return "create"
+    return "check"
+
+_REVISION_PATTERN = re.compile(r"^(revision|down_revision)\b[^=]*=\s*(.+)$", re.MULTILINE)
+
+def get_migration_heads() -> set:
+    # Reads the revision ids straight from the version files; loading Alembic's
+    # ScriptDirectory imports every migration and costs more than the check itself
+    revisions, parents = set(), set()
+    versions_dir = os.path.join(ALEMBIC_DIR, "versions")
+    for filename in os.listdir(versions_dir):
+        if not filename.endswith(".py"):
+            continue
+        with open(os.path.join(versions_dir, filename), encoding="utf-8") as f:
+            for name, value in _REVISION_PATTERN.findall(f.read()):
+                ids = set(re.findall(r"['\"]([^'\"]+)['\"]", value))
+                (revisions if name == "revision" else parents).update(ids)
+    return revisions - parents
+
+def prepare_schema():
+    mode = get_schema_mode(SQLALCHEMY_DATABASE_URL)
+    if mode == "create":
+        Base.metadata.create_all(bind=engine)
+    elif mode == "check":
+        with engine.connect() as conn:
+            current = set(conn.execute(text("SELECT version_num FROM alembic_version")).scalars())
+        expected = get_migration_heads()
+        if current != expected:
+            raise RuntimeError(
+                f"Database is at revision {sorted(current) or 'none'}, expected {sorted(expected)}. "
+                "Run `alembic upgrade head`."
+            )
+
+# Async path, enabled with DB_ASYNC=true. Requests then run their queries on an
+# asyncpg (or aiosqlite) engine on the event loop instead of holding a threadpool thread.
+ASYNC_DB_ENABLED = _env_bool("DB_ASYNC", False)
+
+def get_async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+        # asyncpg spells libpq's sslmode as ssl
+        if "sslmode" in parsed.query:
+            parsed = parsed.update_query_dict({"ssl": parsed.query["sslmode"]}) \
+                .difference_update_query(["sslmode"])
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    else:
+        raise ValueError(f"No async driver configured for {backend}")
+    return parsed.render_as_string(hide_password=False)
+
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB_ENABLED:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    ASYNC_DATABASE_URL = get_async_database_url(SQLALCHEMY_DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **get_engine_options(ASYNC_DATABASE_URL))
+    # Objects are serialized after the handler returns; don't expire them on commit
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+class SessionRunner:
+    """
+    Runs a function taking a sync Session, whichever engine is configured.
+    Sync mode hands it to the threadpool; async mode runs it through
+    AsyncSession.run_sync, so the I/O is awaited on the event loop.
+    """
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn, *args, **kwargs):
+        if ASYNC_DB_ENABLED:
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def release(self):
+        # Give the connection back to the pool early, e.g. before a long-lived stream;
+        # the session stays usable and reconnects on its next query
+        if ASYNC_DB_ENABLED:
+            await self.session.close()
+        else:
+            await run_in_threadpool(self.session.close)
+
+async def get_runner():
+    if ASYNC_DB_ENABLED:
+        async with AsyncSessionLocal() as session:
+            yield SessionRunner(session)
+    else:
+        db = SessionLocal()
+        try:
+            yield SessionRunner(db)
+        finally:
+            await run_in_threadpool(db.close)
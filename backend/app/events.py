@@ -0,0 +1,71 @@
+import asyncio
+import json
+import os
+from typing import Optional
+
+# Per-subscriber backlog. A dashboard that falls this far behind is disconnected
+# (it reconnects and catches up through /projects/changes) rather than buffered.
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+# Comment line sent on idle streams so proxies don't close them
+EVENT_KEEPALIVE_SECONDS = int(os.getenv("EVENT_KEEPALIVE_SECONDS", "15"))
+
+class EventBroker:
+    """
+    In-process pub/sub for project changes. Each event is encoded once as a
+    server-sent event and fanned out to bounded per-subscriber queues. Only
+    reaches dashboards connected to this worker. Call from the event loop.
+    """
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event_type: str, data):
+        if not self._subscribers:
+            return
+        message = f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n".encode("utf-8")
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop(queue)
+
+    def close(self):
+        # End every stream, e.g. on shutdown
+        for queue in list(self._subscribers):
+            self._drop(queue)
+
+    def _drop(self, queue: asyncio.Queue):
+        # Discard the backlog and leave only the end-of-stream marker
+        self._subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    async def stream(self, queue: asyncio.Queue, keepalive_seconds: int = EVENT_KEEPALIVE_SECONDS):
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    message: Optional[bytes] = await asyncio.wait_for(queue.get(), keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(queue)
+
+project_events = EventBroker()
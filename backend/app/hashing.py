@@ -0,0 +1,23 @@
+import bcrypt
+import os
+
+# Kept free of app imports: these run in the login hashing worker processes,
+# which import this module on start-up.
+
+def verify_password(plain_password, hashed_password):
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def get_password_hash(password, rounds=12):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+def get_hash_rounds(hashed_password) -> int:
+    # "$2b$12$<salt+hash>" -> 12
+    try:
+        return int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+def init_worker(niceness: int):
+    # Hashing workers yield the CPU to the API process under contention
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
@@ -0,0 +1,205 @@
+import csv
+import io
+from typing import Callable, Optional
+from sqlalchemy import func, insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import models, logic
+from .client_index import client_index
+from .project_filter import project_filter
+from .response_cache import response_cache
+
+# Accepts the layout written by /projects/export. master_id is ignored;
+# client_code, when present, is kept for new clients if still free.
+REQUIRED_COLUMNS = ["client_name", "region", "territory", "currency", "show_code", "project_name", "misc_info"]
+OPTIONAL_COLUMNS = ["client_code", "source", "brand", "country", "creation_mode"]
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+def _clean(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def iter_rows(file, filename: str):
+    """Yield (row_number, dict) from a CSV or XLSX upload without loading it all."""
+    if filename.lower().endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            header = [_clean(h) for h in next(rows, [])]
+            for row_number, values in enumerate(rows, start=2):
+                if values and any(v is not None for v in values):
+                    yield row_number, dict(zip(header, values))
+        finally:
+            wb.close()
+    else:
+        reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+        # Header is line 1
+        for row_number, row in enumerate(reader, start=2):
+            yield row_number, row
+
+def _validate_columns(row: dict):
+    missing = [c for c in REQUIRED_COLUMNS if c not in row]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+def _parse_row(raw: dict):
+    row = {c: _clean(raw.get(c)) for c in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+    errors = [f"{c} is required" for c in REQUIRED_COLUMNS if not row[c]]
+    return row, errors
+
+def _import_batch(db: Session, batch: list, seen_names: set, seen_codes: set,
+                  username: Optional[str], dry_run: bool, report: dict):
+    # 1. Duplicates within the file and against Projects, in one query per batch
+    names = [row["project_name"] for _, row in batch]
+    show_codes = [row["show_code"] for _, row in batch]
+    taken_names, taken_codes = set(), set()
+    for name, code in db.query(models.Project.project_name, models.Project.show_code).filter(
+        or_(models.Project.project_name.in_(names), models.Project.show_code.in_(show_codes))
+    ):
+        taken_names.add(name)
+        taken_codes.add(code)
+
+    valid = []
+    for row_number, row in batch:
+        errors = []
+        if row["project_name"] in taken_names or row["project_name"] in seen_names:
+            errors.append("Project Name already exists")
+        if row["show_code"] in taken_codes or row["show_code"] in seen_codes:
+            errors.append("Show Code already exists")
+        seen_names.add(row["project_name"])
+        seen_codes.add(row["show_code"])
+        if errors:
+            _add_error(report, row_number, errors)
+        else:
+            valid.append((row_number, row))
+    if not valid:
+        return
+
+    # 2. Resolve client codes: existing clients in one query, new ones allocated as a batch
+    client_keys = {(row["client_name"].lower(), row["misc_info"].lower()) for _, row in valid}
+    existing = {}
+    for client_id, name, misc_info, code in db.query(
+        models.Client.client_id, models.Client.client_name, models.Client.misc_info, models.Client.client_code
+    ).filter(func.lower(models.Client.client_name).in_({name for name, _ in client_keys})):
+        existing.setdefault((name.lower(), misc_info.lower()), (client_id, code))
+
+    new_clients = {}
+    for _, row in valid:
+        key = (row["client_name"].lower(), row["misc_info"].lower())
+        if key not in existing and key not in new_clients:
+            new_clients[key] = row
+    new_codes = logic.allocate_client_codes(db, [
+        (row["client_name"], row["region"], row["territory"], row["misc_info"], row["client_code"])
+        for row in new_clients.values()
+    ], username=username)
+    allocated = dict(zip(new_clients, new_codes))
+
+    if dry_run:
+        report["imported"] += len(valid)
+        return
+
+    # 3. Multi-row inserts, one statement per table. A savepoint keeps a batch that
+    # collides with a concurrent write from taking earlier batches down with it.
+    master_rows, project_rows = [], []
+    for _, row in valid:
+        key = (row["client_name"].lower(), row["misc_info"].lower())
+        master_rows.append({
+            "client_name": row["client_name"],
+            "region": row["region"],
+            "territory": row["territory"],
+            "currency": row["currency"],
+            "show_code": row["show_code"],
+            "project_name": row["project_name"],
+            "misc_info": row["misc_info"],
+            "client_code": existing[key][1] if key in existing else allocated[key],
+            "source": row["source"],
+            "brand": row["brand"],
+            "country": row["country"],
+            "creation_mode": row["creation_mode"] or ("Existing Client" if key in existing else "New Client"),
+            "created_by": username,
+        })
+        project_rows.append({
+            "project_name": row["project_name"],
+            "show_code": row["show_code"],
+            "created_by": username,
+        })
+    client_rows = [
+        {"client_name": row["client_name"], "client_code": allocated[key],
+         "misc_info": row["misc_info"], "created_by": username}
+        for key, row in new_clients.items()
+    ]
+
+    try:
+        with db.begin_nested():
+            client_ids = {code: client_id for client_id, code in existing.values()}
+            if client_rows:
+                client_ids.update((code, client_id) for client_id, code in db.execute(
+                    insert(models.Client).returning(models.Client.client_id, models.Client.client_code), client_rows
+                ))
+            project_ids = db.execute(
+                insert(models.Project).returning(models.Project.project_id, sort_by_parameter_order=True),
+                project_rows
+            ).scalars().all()
+            for master_row, project_id in zip(master_rows, project_ids):
+                master_row["project_id"] = project_id
+                master_row["client_id"] = client_ids[master_row["client_code"]]
+            db.execute(insert(models.Master), master_rows)
+    except IntegrityError:
+        for row_number, _ in valid:
+            _add_error(report, row_number, ["Conflicts with a concurrent change; retry this row"])
+        return
+    report["imported"] += len(valid)
+    report["new_clients"].extend((row["client_name"], row["misc_info"]) for row in new_clients.values())
+    for _, row in valid:
+        project_filter.add(row["project_name"], row["show_code"])
+
+def _add_error(report: dict, row_number: int, errors: list):
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"row": row_number, "errors": errors})
+
+def import_projects(db: Session, file, filename: str, username: Optional[str] = None,
+                    dry_run: bool = False, batch_size: int = IMPORT_BATCH_SIZE,
+                    on_progress: Optional[Callable[[int], None]] = None) -> dict:
+    """
+    Import projects from an uploaded CSV/XLSX in batches, committing each batch.
+    Invalid rows are skipped and reported by row number; valid rows are inserted.
+    on_progress, if given, gets the number of rows read after each batch.
+    """
+    report = {"imported": 0, "failed": 0, "errors": [], "dry_run": dry_run, "new_clients": []}
+    seen_names, seen_codes = set(), set()
+    batch = []
+    columns_checked = False
+
+    for row_number, raw in iter_rows(file, filename):
+        if not columns_checked:
+            _validate_columns(raw)
+            columns_checked = True
+        row, errors = _parse_row(raw)
+        if errors:
+            _add_error(report, row_number, errors)
+            continue
+        batch.append((row_number, row))
+        if len(batch) >= batch_size:
+            _import_batch(db, batch, seen_names, seen_codes, username, dry_run, report)
+            db.commit()
+            batch = []
+            if on_progress:
+                on_progress(row_number - 1)
+
+    if batch:
+        _import_batch(db, batch, seen_names, seen_codes, username, dry_run, report)
+    db.commit()
+    if on_progress:
+        on_progress(report["imported"] + report["failed"])
+    for client_name, misc_info in report.pop("new_clients"):
+        client_index.add(client_name, misc_info)
+    if report["imported"] and not dry_run:
+        response_cache.invalidate("projects", "client-details")
+    report["errors"].sort(key=lambda e: e["row"])
+    return report
@@ -0,0 +1,297 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session, sessionmaker
+from . import database, models
+
+logger = logging.getLogger(__name__)
+
+# Worker threads for background jobs (exports, imports). Kept small so jobs can't crowd
+# out interactive requests; jobs also get their own connection pool, so a long export
+# never makes a request wait for a connection.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Queued + running jobs per worker process before submissions get a 503
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "20"))
+# Uploads and finished files, on local disk. With several hosts, share this directory
+# or route a job's download to the host that ran it.
+JOB_ARTIFACT_DIR = os.getenv("JOB_ARTIFACT_DIR") or os.path.join(tempfile.gettempdir(), "marketing-jobs")
+JOB_ARTIFACT_TTL_HOURS = int(os.getenv("JOB_ARTIFACT_TTL_HOURS", "24"))
+# A queued or running job whose heartbeat is older than this was left behind by a
+# process that died; housekeeping marks it failed
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "600"))
+# Progress is written to the jobs table at most this often
+JOB_PROGRESS_INTERVAL_SECONDS = 1.0
+# Job directories looked up per query when sweeping expired files
+SWEEP_BATCH_SIZE = 500
+
+ACTIVE_STATUSES = ("queued", "running")
+
+class JobQueueFull(RuntimeError):
+    pass
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+def job_directory(job_id: str) -> str:
+    return os.path.join(JOB_ARTIFACT_DIR, job_id)
+
+def save_upload(job_id: str, file, filename: str) -> str:
+    # Request uploads are gone once the response is sent; keep a copy for the job
+    os.makedirs(job_directory(job_id), exist_ok=True)
+    name = "upload" + os.path.splitext(filename)[1].lower()
+    with open(os.path.join(job_directory(job_id), name), "wb") as out:
+        shutil.copyfileobj(file, out)
+    return name
+
+def discard_files(job_id: str):
+    shutil.rmtree(job_directory(job_id), ignore_errors=True)
+
+def _modified_before(path: str, cutoff: datetime) -> bool:
+    try:
+        return os.path.getmtime(path) < cutoff.timestamp()
+    except OSError:
+        # Removed meanwhile, e.g. by another process's sweep
+        return False
+
+class JobContext:
+    """Handed to a job handler: where to write files and how to report progress."""
+    def __init__(self, runner: "JobRunner", job_id: str, created_by: Optional[str]):
+        self.runner = runner
+        self.job_id = job_id
+        self.created_by = created_by
+        self.directory = job_directory(job_id)
+        self.done = 0
+        self.total: Optional[int] = None
+        self.artifact_path: Optional[str] = None
+        self.artifact_name: Optional[str] = None
+        self._reported_at = 0.0
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def set_artifact(self, path: str, download_name: str):
+        self.artifact_path, self.artifact_name = path, download_name
+
+    def progress(self, done: int, total: Optional[int] = None, force: bool = False):
+        self.done = done
+        if total is not None:
+            self.total = total
+        now = time.monotonic()
+        if not force and now - self._reported_at < JOB_PROGRESS_INTERVAL_SECONDS:
+            return
+        self._reported_at = now
+        self.runner.update_job(self.job_id, progress=self.done, total=self.total, heartbeat_at=_utcnow())
+
+    def track(self, items, total: Optional[int] = None, every: int = 1000):
+        # Yields items unchanged, reporting progress every `every` items and at the end
+        done = 0
+        for done, item in enumerate(items, start=1):
+            yield item
+            if done % every == 0:
+                self.progress(done, total)
+        self.progress(done, total, force=True)
+
+    def call_in_loop(self, fn, *args):
+        # For event-loop-only APIs such as EventBroker.publish
+        self.runner.call_in_loop(fn, *args)
+
+class JobRunner:
+    """
+    Runs registered handlers on a bounded thread pool, outside any request, so a
+    job outlives the client that submitted it. Status, progress and results live in
+    the jobs table, so any worker process can answer a poll; files are written
+    under JOB_ARTIFACT_DIR. A handler takes (db, context, **params) and returns a
+    JSON-serialisable result.
+    """
+    def __init__(self, workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING):
+        self.workers = max(workers, 1)
+        self.max_pending = max_pending
+        self._handlers = {}
+        self._executor = None
+        self._session_factory = None
+        self._loop = None
+        self._active = set()  # job ids queued or running in this process
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def handler(self, kind: str):
+        def register(fn):
+            self._handlers[kind] = fn
+            return fn
+        return register
+
+    def _session(self) -> Session:
+        with self._lock:
+            if self._session_factory is None:
+                url = database.SQLALCHEMY_DATABASE_URL
+                options = database.get_engine_options(url)
+                if "pool_size" in options:
+                    # One connection for the job's queries and one for its progress writes
+                    options.update(pool_size=2 * self.workers, max_overflow=0)
+                self._session_factory = sessionmaker(autocommit=False, autoflush=False,
+                                                     bind=create_engine(url, **options))
+        return self._session_factory()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            return self._executor
+
+    def start(self, loop=None):
+        self._loop = loop
+        self._stop.clear()
+        os.makedirs(JOB_ARTIFACT_DIR, exist_ok=True)
+        threading.Thread(target=self._housekeeping, name="job-housekeeping", daemon=True).start()
+
+    def shutdown(self):
+        # Running jobs finish before the interpreter exits (the pool's threads are joined
+        # then); jobs that never started are failed now instead of waiting to go stale
+        self._stop.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            active = list(self._active)
+        if active:
+            with self._session() as db:
+                db.execute(update(models.Job).where(
+                    models.Job.job_id.in_(active), models.Job.status == "queued"
+                ).values(status="failed", error="The server shut down before the job started.",
+                         finished_at=_utcnow()))
+                db.commit()
+
+    def call_in_loop(self, fn, *args):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(fn, *args)
+
+    def submit(self, db: Session, kind: str, params: dict, username: Optional[str],
+               job_id: Optional[str] = None) -> models.Job:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = job_id or new_job_id()
+        with self._lock:
+            if len(self._active) >= self.max_pending:
+                raise JobQueueFull("Too many background jobs in progress. Please retry shortly.")
+            self._active.add(job_id)
+        try:
+            job = models.Job(job_id=job_id, kind=kind, status="queued", params=params, progress=0,
+                             created_by=username, heartbeat_at=_utcnow())
+            db.add(job)
+            # Committed before it is queued, so the worker always finds the row
+            db.commit()
+            self._get_executor().submit(self._run, job_id)
+        except BaseException:
+            with self._lock:
+                self._active.discard(job_id)
+            raise
+        return job
+
+    def update_job(self, job_id: str, **values):
+        with self._session() as db:
+            db.execute(update(models.Job).where(models.Job.job_id == job_id).values(**values))
+            db.commit()
+
+    def _run(self, job_id: str):
+        db = self._session()
+        try:
+            job = db.get(models.Job, job_id)
+            context = JobContext(self, job_id, job.created_by)
+            handler, params = self._handlers[job.kind], dict(job.params or {})
+            job.status = "running"
+            job.started_at = job.heartbeat_at = _utcnow()
+            db.commit()
+
+            os.makedirs(context.directory, exist_ok=True)
+            result = handler(db, context, **params)
+            db.commit()
+            self.update_job(
+                job_id, status="succeeded", result=result, progress=context.done,
+                total=context.total if context.total is not None else context.done,
+                artifact_path=context.artifact_path, artifact_name=context.artifact_name,
+                heartbeat_at=_utcnow(), finished_at=_utcnow()
+            )
+        except Exception as e:
+            db.rollback()
+            # ValueError is the handlers' "bad input" signal; anything else stays in the logs
+            if isinstance(e, ValueError):
+                logger.warning("Job %s rejected its input: %s", job_id, e)
+                error = str(e)
+            else:
+                logger.exception("Job %s failed", job_id)
+                error = "The job failed unexpectedly."
+            # Partial output and the saved upload are of no use once the job has failed
+            discard_files(job_id)
+            try:
+                self.update_job(job_id, status="failed", error=error, finished_at=_utcnow())
+            except Exception:
+                logger.exception("Could not record the failure of job %s", job_id)
+        finally:
+            db.close()
+            with self._lock:
+                self._active.discard(job_id)
+
+    def _housekeeping(self):
+        interval = max(1, JOB_STALE_SECONDS // 3)
+        while True:
+            try:
+                self._heartbeat()
+                self.sweep()
+            except Exception:
+                logger.exception("Job housekeeping failed")
+            if self._stop.wait(interval):
+                return
+
+    def _heartbeat(self):
+        # Queued jobs don't report progress; keep them from looking orphaned
+        with self._lock:
+            active = list(self._active)
+        if active:
+            with self._session() as db:
+                db.execute(update(models.Job).where(
+                    models.Job.job_id.in_(active), models.Job.status.in_(ACTIVE_STATUSES)
+                ).values(heartbeat_at=_utcnow()))
+                db.commit()
+
+    def sweep(self):
+        now = _utcnow()
+        with self._session() as db:
+            # 1. Jobs whose process died mid-run
+            db.execute(update(models.Job).where(
+                models.Job.status.in_(ACTIVE_STATUSES),
+                models.Job.heartbeat_at < now - timedelta(seconds=JOB_STALE_SECONDS)
+            ).values(status="failed", error="Interrupted: the server running this job stopped.",
+                     finished_at=now))
+
+            # 2. Files of jobs that finished more than the TTL ago, whatever the outcome.
+            # Driven by what is on disk, so each job's directory is visited once.
+            cutoff = now - timedelta(hours=JOB_ARTIFACT_TTL_HOURS)
+            names = os.listdir(JOB_ARTIFACT_DIR) if os.path.isdir(JOB_ARTIFACT_DIR) else []
+            for start in range(0, len(names), SWEEP_BATCH_SIZE):
+                chunk = names[start:start + SWEEP_BATCH_SIZE]
+                expired_by_job = dict(db.query(models.Job.job_id, models.Job.finished_at < cutoff)
+                                      .filter(models.Job.job_id.in_(chunk)))
+                expired = [job_id for job_id, is_expired in expired_by_job.items() if is_expired]
+                for name in chunk:
+                    # No row: the submit failed after its upload was saved
+                    if name not in expired_by_job and _modified_before(job_directory(name), cutoff):
+                        expired.append(name)
+                for job_id in expired:
+                    discard_files(job_id)
+                if expired:
+                    db.execute(update(models.Job).where(models.Job.job_id.in_(expired)).values(artifact_path=None))
+            db.commit()
+
+job_runner = JobRunner()
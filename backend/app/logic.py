@@ -1,7 +1,26 @@
-import random
+import hashlib
+import itertools
+import os
+from datetime import datetime, timedelta, timezone
+from math import comb, gcd
+from typing import Optional
+from sqlalchemy import String, delete, exists, false, func, insert, literal, or_, select, text, true, union_all
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 from . import models
 
+# Upper bound on 3-letter slices checked per generation; long names have thousands
+MAX_CODE_CANDIDATES = 256
+# How long a previewed code stays reserved for the user who saw it
+CLIENT_CODE_HOLD_MINUTES = int(os.getenv("CLIENT_CODE_HOLD_MINUTES", "10"))
+# Insert attempts before giving up when other requests keep winning the same codes
+CODE_ALLOCATION_ATTEMPTS = 5
+# Keeps IN (...) lists well below driver parameter limits
+IN_QUERY_CHUNK_SIZE = 5000
+# Mixed into the hash that orders each name's candidates; changing it reshuffles every
+# name's order (existing codes are unaffected)
+CLIENT_CODE_SEED = os.getenv("CLIENT_CODE_SEED", "")
+
 def clean_string(s: str) -> str:
     return "".join(c for c in s if c.isalnum()).upper()
 
@@ -27,16 +46,66 @@ def get_territory_char(territory: str) -> str:
 
 def get_random_3_letters(name: str) -> str:
     """
-    Picks 3 random letters from the name, preserving original order.
-    Example: Kabilarasan -> KBL, KBS, KAA, etc.
+    The name's first candidate slice: 3 letters in their original order.
+    Deterministic per name despite the historical name.
+    Example: Kabilarasan -> KBL, KAA, etc. depending on the name's hash.
+    """
+    return get_candidate_slices(name, 1)[0]
+
+def _candidate_order(cleaned: str, total: int, seed: str = CLIENT_CODE_SEED) -> tuple:
+    # (offset, stride) of the name's walk over its `total` index triples. Rank i is
+    # (offset + i * stride) mod total; a stride coprime with total visits each triple once.
+    digest = hashlib.blake2b(f"{seed}:{cleaned}".encode("utf-8"), digest_size=16).digest()
+    offset = int.from_bytes(digest[:8], "little") % total
+    stride = 1 + int.from_bytes(digest[8:], "little") % max(1, total - 1)
+    while gcd(stride, total) != 1:
+        stride = stride % max(1, total - 1) + 1
+    return offset, stride
+
+def _unrank_triple(rank: int, n: int) -> tuple:
+    # The rank-th triple of itertools.combinations(range(n), 3)
+    triple, start = [], 0
+    for remaining in (3, 2, 1):
+        for i in range(start, n):
+            count = comb(n - i - 1, remaining - 1)
+            if rank < count:
+                triple.append(i)
+                start = i + 1
+                break
+            rank -= count
+    return tuple(triple)
+
+def get_candidate_slices(name: str, limit: int = MAX_CODE_CANDIDATES, seed: str = CLIENT_CODE_SEED) -> list:
+    """
+    Distinct order-preserving 3-letter slices of the name, at most `limit`, in an
+    order fixed by the name's hash: the same name always yields the same list, so a
+    preview and the save that follows agree, and the search cost is bounded by `limit`.
     """
     cleaned = clean_string(name)
     if len(cleaned) < 3:
-        return cleaned.ljust(3, 'X')
-    
-    # Pick 3 indices
-    indices = sorted(random.sample(range(len(cleaned)), 3))
-    return "".join(cleaned[i] for i in indices)
+        return [cleaned.ljust(3, 'X')]
+
+    total = comb(len(cleaned), 3)
+    offset, stride = _candidate_order(cleaned, total, seed)
+    slices = (
+        "".join(cleaned[i] for i in _unrank_triple((offset + step * stride) % total, len(cleaned)))
+        for step in range(min(limit, total))
+    )
+    # Repeated letters make different index triples spell the same slice
+    return list(dict.fromkeys(slices))
+
+def find_free_code(candidates: list, taken: set):
+    for code in candidates:
+        if code not in taken:
+            return code
+    return None
+
+def next_suffixed_code(base_code: str, taken: set) -> str:
+    # Lowest numbered variant (KBL-DC-ID1, KBL-DC-ID2, ...) not in `taken`
+    suffix = 1
+    while f"{base_code}{suffix}" in taken:
+        suffix += 1
+    return f"{base_code}{suffix}"
 
 def construct_code(slice_3: str, region: str, territory: str, misc_info: str) -> str:
     r_code = get_region_char(region)
@@ -51,42 +120,390 @@ def construct_code(slice_3: str, region: str, territory: str, misc_info: str) ->
     # Example: KBL-DC-ID
     return f"{slice_3}-{r_code}{t_code}-{m_code}"
 
-def generate_unique_client_code(db: Session, client_name: str, region: str, territory: str, misc_info: str) -> str:
-    # Rule 1: Reuse existing client code if client_name + misc_info matches
-    existing_client = db.query(models.Client).filter(
-        models.Client.client_name.ilike(client_name),
-        models.Client.misc_info.ilike(misc_info)
-    ).first()
-    
+def client_code_candidates(client_name: str, region: str, territory: str, misc_info: str,
+                           limit: int = MAX_CODE_CANDIDATES) -> list:
+    return [construct_code(slice_3, region, territory, misc_info) for slice_3 in get_candidate_slices(client_name, limit)]
+
+# Batch (column-wise) versions of the functions above, for imports, backfills and
+# re-coding. numpy/pandas are imported lazily so they stay off the request path.
+
+def clean_strings(values):
+    """clean_string over a column; returns a pandas Series."""
+    import pandas as pd
+
+    values = pd.Series(values, dtype=object).fillna("")
+    ascii_mask = values.map(str.isascii, na_action=None).astype(bool)
+    cleaned = values.str.replace(r"[^0-9A-Za-z]+", "", regex=True).str.upper()
+    # str.isalnum() also keeps non-ASCII letters and digits; those rows take the scalar path
+    if not ascii_mask.all():
+        cleaned[~ascii_mask] = values[~ascii_mask].map(clean_string)
+    return cleaned
+
+def code_suffixes(regions, territories, misc_infos):
+    """The "-RT-MI" part of construct_code for each row, as a numpy array."""
+    import pandas as pd
+
+    # Few distinct (region, territory, misc_info) triples: run the scalar rules once per triple
+    frame = pd.DataFrame({"region": regions, "territory": territories, "misc_info": misc_infos}).fillna("")
+    codes, uniques = pd.MultiIndex.from_frame(frame).factorize()
+    suffixes = [construct_code("", region, territory, misc_info) for region, territory, misc_info in uniques]
+    return pd.Index(suffixes, dtype=object).to_numpy()[codes]
+
+def _unrank_triples(ranks, n: int):
+    """_unrank_triple over an array of ranks; returns an array of shape ranks.shape + (3,)."""
+    import numpy as np
+
+    # Triples starting below a: C(n, 3) - C(n - a, 3); pairs of the last k letters: C(k, 2)
+    k = np.arange(n + 1, dtype=np.int64)
+    triples_of, pairs_of = k * (k - 1) * (k - 2) // 6, k * (k - 1) // 2
+    first = n - np.searchsorted(triples_of, triples_of[n] - ranks, side="left")
+    ranks = ranks - (triples_of[n] - triples_of[n - first])
+    rest = pairs_of[n - first - 1]
+    second = n - np.searchsorted(pairs_of, rest - ranks, side="left")
+    third = second + 1 + ranks - (rest - pairs_of[n - second])
+    return np.stack([first, second, third], axis=-1)
+
+def batch_candidate_slices(cleaned_names, limit: int = MAX_CODE_CANDIDATES, seed: str = CLIENT_CODE_SEED) -> list:
+    """
+    get_candidate_slices for a column of cleaned names, with the same result per name.
+    Names are processed in groups of equal length as arrays of code points.
+    """
+    import numpy as np
+
+    names = np.asarray(cleaned_names, dtype=object)
+    lengths = np.fromiter((len(name) for name in names), dtype=np.int64, count=len(names))
+    slices = [None] * len(names)
+    for length in np.unique(lengths):
+        rows = np.flatnonzero(lengths == length)
+        if length < 3:
+            for row in rows:
+                slices[row] = [names[row].ljust(3, "X")]
+            continue
+        total = comb(int(length), 3)
+        orders = np.array([_candidate_order(name, total, seed) for name in names[rows]], dtype=np.int64)
+        steps = np.arange(min(limit, total), dtype=np.int64)
+        ranks = (orders[:, :1] + steps[None, :] * orders[:, 1:]) % total
+        triples = _unrank_triples(ranks, int(length))
+        chars = np.array(list(names[rows]), dtype=f"<U{length}").view(np.uint32).reshape(len(rows), length)
+        picked = np.ascontiguousarray(chars[np.arange(len(rows))[:, None, None], triples])
+        for row, row_slices in zip(rows, picked.view("<U3").reshape(len(rows), -1).tolist()):
+            # Repeated letters make different index triples spell the same slice
+            slices[row] = list(dict.fromkeys(row_slices))
+    return slices
+
+def batch_code_candidates(client_names, regions, territories, misc_infos,
+                          limit: int = MAX_CODE_CANDIDATES, seed: str = CLIENT_CODE_SEED) -> list:
+    """client_code_candidates for a batch of clients."""
+    suffixes = code_suffixes(regions, territories, misc_infos)
+    slices = batch_candidate_slices(clean_strings(client_names).tolist(), limit, seed)
+    return [[slice_3 + suffix for slice_3 in row_slices] for row_slices, suffix in zip(slices, suffixes)]
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _insert(db: Session):
+    # INSERT ... ON CONFLICT is dialect-specific in SQLAlchemy; both supported backends have it
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert
+    return postgresql.insert
+
+def _taken_codes(db: Session, codes=None, prefix: Optional[str] = None, username: Optional[str] = None) -> set:
+    # Codes in use by a client or currently held for another user, in one round trip
+    reservation = models.ClientCodeReservation
+    if codes is not None:
+        client_match = models.Client.client_code.in_(codes)
+        held_match = reservation.client_code.in_(codes)
+    else:
+        # Served on Postgres by the varchar_pattern_ops indexes (migration c2f7a9e4d1b8)
+        client_match = models.Client.client_code.like(f"{prefix}%")
+        held_match = reservation.client_code.like(f"{prefix}%")
+
+    held = select(reservation.client_code).where(held_match, reservation.expires_at > _utcnow())
+    if username:
+        held = held.where(or_(reservation.reserved_by.is_(None), reservation.reserved_by != username))
+    query = union_all(select(models.Client.client_code).where(client_match), held)
+    return set(db.execute(query).scalars())
+
+def client_key_filter(client_name: str, misc_info: str):
+    # Rule 1: client_name + misc_info identify a client (case-insensitive).
+    # Matches the ix_clients_client_key expression index.
+    return (
+        func.lower(models.Client.client_name) == client_name.lower(),
+        func.lower(models.Client.misc_info) == misc_info.lower(),
+    )
+
+def find_existing_client(db: Session, client_name: str, misc_info: str):
+    return db.query(models.Client).filter(*client_key_filter(client_name, misc_info)).first()
+
+def iter_new_client_codes(db: Session, client_name: str, region: str, territory: str, misc_info: str,
+                          username: Optional[str] = None):
+    """
+    Free codes for a new client, best first (Rule 2). Candidates and the codes taken
+    among them (Clients and live reservations) are read once, in one indexed query;
+    after losing a code to a concurrent writer, the caller takes the next one from the
+    same scan without querying again.
+    """
+    candidates = client_code_candidates(client_name, region, territory, misc_info)
+    taken = _taken_codes(db, codes=candidates, username=username)
+    for code in candidates:
+        if code not in taken:
+            yield code
+
+    # Fallback when every slice is taken (short or very common names):
+    # number the first candidate, reading its whole suffix family in one query.
+    base_code = candidates[0]
+    taken |= _taken_codes(db, prefix=base_code, username=username)
+    while True:
+        code = next_suffixed_code(base_code, taken)
+        yield code
+        taken.add(code)
+
+def allocate_new_client_code(db: Session, client_name: str, region: str, territory: str, misc_info: str,
+                             username: Optional[str] = None, exclude=()) -> str:
+    return next(code for code in iter_new_client_codes(db, client_name, region, territory, misc_info, username)
+                if code not in exclude)
+
+def allocate_client_codes(db: Session, clients: list, username: Optional[str] = None,
+                          candidates_per_client: int = 32) -> list:
+    """
+    Batch version of allocate_new_client_code for imports. `clients` holds
+    (client_name, region, territory, misc_info, preferred_code) tuples; returns one
+    code per entry, unique against the DB, live reservations and each other.
+    Candidates are computed column-wise (batch_code_candidates) and taken codes for
+    the whole batch are read with a few IN queries.
+    """
+    if not clients:
+        return []
+    names, regions, territories, misc_infos, preferred_codes = zip(*clients)
+    candidate_lists = [
+        ([preferred_code] if preferred_code else []) + candidates
+        for preferred_code, candidates in zip(preferred_codes, batch_code_candidates(
+            names, regions, territories, misc_infos, candidates_per_client
+        ))
+    ]
+
+    all_codes = sorted({code for candidates in candidate_lists for code in candidates})
+    taken = set()
+    for start in range(0, len(all_codes), IN_QUERY_CHUNK_SIZE):
+        taken |= _taken_codes(db, codes=all_codes[start:start + IN_QUERY_CHUNK_SIZE], username=username)
+
+    codes = []
+    for (client_name, region, territory, misc_info, preferred_code), candidates in zip(clients, candidate_lists):
+        code = find_free_code(candidates, taken)
+        if code is None:
+            base_code = candidates[1 if preferred_code else 0]
+            code = next_suffixed_code(base_code, _taken_codes(db, prefix=base_code, username=username) | taken)
+        # Later entries in the batch must not get the same code
+        taken.add(code)
+        codes.append(code)
+    return codes
+
+def generate_unique_client_code(db: Session, client_name: str, region: str, territory: str, misc_info: str,
+                                username: Optional[str] = None) -> str:
+    existing_client = find_existing_client(db, client_name, misc_info)
     if existing_client:
         return existing_client.client_code
+    return allocate_new_client_code(db, client_name, region, territory, misc_info, username=username)
 
-    # Rule 2: Generate new code with random 3 letters
-    # Try up to 50 times to find a unique random combination
-    for _ in range(50):
-        slice_3 = get_random_3_letters(client_name)
-        code = construct_code(slice_3, region, territory, misc_info)
-        
-        # Check collision
-        collision = db.query(models.Client).filter(models.Client.client_code == code).first()
-        if not collision:
-            return code
-            
-    # Fallback if random attempts fail (unlikely unless name is very short):
-    # Use a suffix
-    base_slice = get_random_3_letters(client_name)
-    base_code = construct_code(base_slice, region, territory, misc_info)
-    
-    suffix = 1
-    while True:
-        code = f"{base_code}{suffix}"
-        collision = db.query(models.Client).filter(models.Client.client_code == code).first()
-        if not collision:
-            return code
-        suffix += 1
+def reserve_client_code(db: Session, code: str, client_name: str, region: str, territory: str, misc_info: str,
+                        username: Optional[str]) -> bool:
+    """
+    Hold `code` for `username`. Succeeds if the code is free, already held by
+    the same user, or its previous hold has expired; returns False otherwise.
+    """
+    reservation = models.ClientCodeReservation
+    now = _utcnow()
+    values = dict(
+        client_code=code,
+        client_name=client_name,
+        misc_info=misc_info,
+        region=region,
+        territory=territory,
+        reserved_by=username,
+        expires_at=now + timedelta(minutes=CLIENT_CODE_HOLD_MINUTES),
+    )
+    stmt = _insert(db)(reservation).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[reservation.client_code],
+        set_={k: stmt.excluded[k] for k in values if k != "client_code"},
+        where=or_(reservation.expires_at <= now, reservation.reserved_by == username),
+    ).returning(reservation.client_code)
+    return db.execute(stmt).first() is not None
+
+def _caller_holds(username: Optional[str]):
+    reservation = models.ClientCodeReservation
+    return reservation.reserved_by == username if username else false()
+
+def release_holds(db: Session, username: Optional[str], purge_expired: bool = False):
+    """
+    Drop the caller's holds: a user previews one client at a time, so a new preview
+    or a create supersedes the rest. purge_expired also deletes every expired hold;
+    reads ignore those anyway, and deleting them keeps the table and its index bounded.
+    """
+    reservation = models.ClientCodeReservation
+    released = _caller_holds(username)
+    if purge_expired:
+        released = or_(released, reservation.expires_at <= _utcnow())
+    db.query(reservation).filter(released).delete(synchronize_session=False)
+
+def lock_client_key(db: Session, client_name: str, misc_info: str):
+    # Serialise concurrent creates of the *same* client until commit. Other clients are unaffected.
+    # Transaction-scoped, so safe behind a transaction pooler. SQLite already serialises writers.
+    if db.get_bind().dialect.name == "postgresql":
+        key = f"client:{client_name.lower()}|{misc_info.lower()}"
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": key})
 
-def preview_client_code_logic(db: Session, client_name: str, region: str, territory: str, misc_info: str) -> str:
-    # For preview, we just generate one. 
-    # NOTE: Since it's random, the preview might differ from the final save if not passed explicitly.
-    # The frontend should capture this preview and send it.
-    return generate_unique_client_code(db, client_name, region, territory, misc_info)
+def insert_client_with_code(db: Session, client_name: str, region: str, territory: str, misc_info: str,
+                            username: Optional[str], preferred_code: Optional[str] = None) -> Optional[tuple]:
+    """
+    Insert a new Client row and return its (client_id, client_code). A previewed
+    `preferred_code` is used when it is free or held by this user; otherwise a fresh
+    code is allocated. Codes lost to a concurrent insert are retried via ON CONFLICT
+    DO NOTHING; if the client itself was inserted concurrently, that row is returned.
+    Returns None if every attempt lost a race.
+    """
+    code = None
+    if preferred_code and preferred_code not in _taken_codes(db, codes=[preferred_code], username=username):
+        code = preferred_code
+
+    codes = iter_new_client_codes(db, client_name, region, territory, misc_info, username)
+    for _ in range(CODE_ALLOCATION_ATTEMPTS):
+        if code is None:
+            code = next(codes)
+        stmt = _insert(db)(models.Client).values(
+            client_name=client_name,
+            client_code=code,
+            misc_info=misc_info,
+            created_by=username
+        ).on_conflict_do_nothing().returning(models.Client.client_id)
+        client_id = db.execute(stmt).scalar()
+        if client_id is not None:
+            # The code is now owned by the client row; release the hold
+            db.query(models.ClientCodeReservation).filter(
+                models.ClientCodeReservation.client_code == code
+            ).delete(synchronize_session=False)
+            return client_id, code
+        existing_client = find_existing_client(db, client_name, misc_info)
+        if existing_client:
+            return existing_client.client_id, existing_client.client_code
+        code = None
+    return None
+
+MASTER_INSERT_COLUMNS = [
+    "client_name", "region", "territory", "currency", "show_code", "project_name", "misc_info",
+    "source", "brand", "country", "creation_mode", "created_by",
+]
+
+def create_project_statement(values: dict, preferred_code: Optional[str], username: Optional[str]):
+    """
+    Postgres-only: create a project in a single statement of data-modifying CTEs.
+
+    Reuses the existing client's code, or inserts the client with `preferred_code`
+    when it is free. A client inserted concurrently conflicts on the unique client
+    key and leaves no code, so the caller falls back to the locked path. The
+    Projects insert is ON CONFLICT DO NOTHING, so a duplicate name/show code returns
+    new_project_id NULL instead of needing a pre-read. The result is one row: the
+    inserted Master columns (NULL when no code could be resolved this way), plus
+    new_project_id.
+    """
+    client, master, reservation = models.Client, models.Master, models.ClientCodeReservation
+    existing = select(client.client_id, client.client_code).where(
+        *client_key_filter(values["client_name"], values["misc_info"])
+    ).limit(1).cte("existing")
+    codes = select(existing.c.client_id, existing.c.client_code)
+
+    new_client = None
+    if preferred_code:
+        held_by_other = select(reservation.client_code).where(
+            reservation.client_code == preferred_code,
+            reservation.expires_at > _utcnow(),
+            or_(reservation.reserved_by.is_(None), reservation.reserved_by != username)
+        )
+        new_client = postgresql.insert(client).from_select(
+            ["client_name", "client_code", "misc_info", "created_by"],
+            select(
+                literal(values["client_name"], String),
+                literal(preferred_code, String),
+                literal(values["misc_info"], String),
+                literal(username, String)
+            ).where(~exists(existing.select()), ~exists(held_by_other))
+        ).on_conflict_do_nothing().returning(client.client_id, client.client_code).cte("new_client")
+        codes = union_all(codes, select(new_client.c.client_id, new_client.c.client_code))
+    codes = codes.cte("codes")
+
+    project = postgresql.insert(models.Project).values(
+        project_name=values["project_name"],
+        show_code=values["show_code"],
+        created_by=username
+    ).on_conflict_do_nothing().returning(models.Project.project_id).cte("new_project")
+
+    new_master = insert(master).from_select(
+        MASTER_INSERT_COLUMNS + ["client_id", "client_code", "project_id"],
+        select(*[literal(values[c], String) for c in MASTER_INSERT_COLUMNS],
+               codes.c.client_id, codes.c.client_code, project.c.project_id)
+        .select_from(codes.join(project, true()))
+    ).returning(*master.__table__.c).cte("new_master")
+
+    # The caller's preview holds are done with; a new client also owns its code now
+    released = _caller_holds(username)
+    if new_client is not None:
+        released = or_(released, reservation.client_code.in_(select(new_client.c.client_code)))
+    released = delete(reservation).where(released).returning(reservation.client_code).cte("released")
+    columns = [
+        new_master,
+        select(project.c.project_id).scalar_subquery().label("new_project_id"),
+        select(func.count()).select_from(released).scalar_subquery().label("released"),
+    ]
+    return select(*columns).select_from(select(literal(1)).subquery().outerjoin(new_master, true()))
+
+def preview_client_code_logic(db: Session, client_name: str, region: str, territory: str, misc_info: str,
+                              username: Optional[str] = None) -> Optional[str]:
+    # Existing clients keep their code; nothing to reserve
+    existing_client = find_existing_client(db, client_name, misc_info)
+    if existing_client:
+        return existing_client.client_code
+    return reserve_preview_code(db, client_name, region, territory, misc_info, username)
+
+def _held_preview(db: Session, client_name: str, region: str, territory: str, misc_info: str,
+                  username: Optional[str]):
+    # The caller's live hold for exactly this client, if any
+    reservation = models.ClientCodeReservation
+    return db.query(reservation).filter(
+        reservation.reserved_by == username,
+        reservation.client_name == client_name,
+        reservation.misc_info == misc_info,
+        reservation.region == region,
+        reservation.territory == territory,
+        reservation.expires_at > _utcnow()
+    ).first()
+
+def peek_preview_code(db: Session, client_name: str, region: str, territory: str, misc_info: str,
+                      username: Optional[str] = None) -> str:
+    # Read-only preview for per-keystroke lookups: the caller's hold for this client, else
+    # the first free candidate. Nothing is reserved; /preview-client-code or the create does
+    # that, and a create whose previewed code was taken meanwhile gets the next free one.
+    held = _held_preview(db, client_name, region, territory, misc_info, username)
+    if held:
+        return held.client_code
+    return next(iter_new_client_codes(db, client_name, region, territory, misc_info, username))
+
+def reserve_preview_code(db: Session, client_name: str, region: str, territory: str, misc_info: str,
+                         username: Optional[str] = None) -> Optional[str]:
+    # Previews reserve the code for CLIENT_CODE_HOLD_MINUTES, so the code shown is the
+    # code saved. Previewing the same client again returns (and extends) the same hold.
+    held = _held_preview(db, client_name, region, territory, misc_info, username)
+    if held:
+        held.expires_at = _utcnow() + timedelta(minutes=CLIENT_CODE_HOLD_MINUTES)
+        code = held.client_code
+        db.commit()
+        return code
+
+    # A new preview replaces the caller's holds for other clients (e.g. an earlier spelling)
+    release_holds(db, username, purge_expired=True)
+    codes = iter_new_client_codes(db, client_name, region, territory, misc_info, username)
+    for code in itertools.islice(codes, CODE_ALLOCATION_ATTEMPTS):
+        if reserve_client_code(db, code, client_name, region, territory, misc_info, username):
+            db.commit()
+            return code
+    db.rollback()
+    return None
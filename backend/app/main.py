@@ -1,12 +1,51 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from . import models, database
+from . import models, database, metrics
+from . import auth as auth_utils
+from .client_index import client_index
+from .events import project_events
+from .jobs import job_runner
 from .routers import auth, marketing
 
-# Create tables (for simplicity in this demo, instead of just Alembic)
-models.Base.metadata.create_all(bind=database.engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Phantom FX Marketing Tool")
+async def _warm_client_index():
+    # Best effort, off the startup path: the lookup endpoints load the index lazily if this fails
+    def load():
+        db = database.SessionLocal()
+        try:
+            client_index.load(db)
+        finally:
+            db.close()
+    try:
+        await run_in_threadpool(load)
+    except Exception:
+        logger.exception("Could not warm the client index at startup")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables (SQLite dev) or check the Alembic revision once; see DB_SCHEMA_MODE
+    await run_in_threadpool(database.prepare_schema)
+    warm_up = asyncio.create_task(_warm_client_index())
+    job_runner.start(asyncio.get_running_loop())
+    yield
+    warm_up.cancel()
+    project_events.close()
+    await run_in_threadpool(job_runner.shutdown)
+    auth_utils.shutdown_hash_pool()
+
+app = FastAPI(title="Phantom FX Marketing Tool", lifespan=lifespan)
+
+# Per-request query count/DB time (Server-Timing header, /api/metrics, query budget)
+metrics.instrument_engine(database.engine)
+if database.async_engine is not None:
+    metrics.instrument_engine(database.async_engine.sync_engine)
+app.add_middleware(metrics.InstrumentationMiddleware)
 
 # CORS
 origins = [
@@ -31,6 +70,11 @@ app.include_router(marketing.router)
 def health_check():
     return {"status": "ok"}
 
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Phantom FX Marketing Tool API"}
@@ -0,0 +1,187 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Query budget per request (0 disables). DB_QUERY_BUDGET_MODE=log warns, "raise" turns an
+# over-budget request into a server error, so test suites fail on it.
+DB_QUERY_BUDGET = int(os.getenv("DB_QUERY_BUDGET", "25"))
+DB_QUERY_BUDGET_MODE = os.getenv("DB_QUERY_BUDGET_MODE", "log").strip().lower()
+# Routes with their own budget (None = unbounded), keyed by route path
+ROUTE_QUERY_BUDGETS = {
+    # Commits every IMPORT_BATCH_SIZE rows, so queries grow with the file
+    "/api/marketing/projects/import": None,
+}
+# The same statement this many times in one request is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "10"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+class RequestStats:
+    """Database work done on behalf of one request."""
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.statements = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.statements[statement] += 1
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds, self.slowest_statement = seconds, statement
+
+    def repeated_statement(self):
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+# A connection runs one statement at a time, so one start-time slot per connection is
+# enough; a statement that fails without reaching handle_error is overwritten by the next
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started_at"] = time.perf_counter()
+
+def _record(conn, statement: str):
+    started_at = conn.info.pop("query_started_at", None)
+    stats = _current_stats.get()
+    if started_at is not None and stats is not None:
+        stats.record(statement, time.perf_counter() - started_at)
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record(conn, statement)
+
+def _handle_error(exception_context):
+    # Failed statements (e.g. expected IntegrityErrors) took database time too
+    if exception_context.connection is not None and exception_context.statement is not None:
+        _record(exception_context.connection, exception_context.statement)
+
+def instrument_engine(engine):
+    # The threadpool and AsyncSession.run_sync both run in a copy of the request's
+    # context, so the hooks see the RequestStats the middleware set up
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+class Histogram:
+    """Prometheus-style cumulative histogram, one series per label tuple."""
+    def __init__(self, name: str, help_text: str, label_names: tuple, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        for labels, (counts, total) in sorted(series.items()):
+            label_text = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+REQUEST_LABELS = ("method", "route", "status")
+request_latency = Histogram(
+    "http_request_duration_seconds", "Time to the first response byte.", REQUEST_LABELS, LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "http_request_db_queries", "SQL statements per request.", REQUEST_LABELS, QUERY_COUNT_BUCKETS
+)
+request_db_time = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request.", REQUEST_LABELS, LATENCY_BUCKETS
+)
+
+def render_metrics() -> str:
+    # Per worker process; scrape every worker, or aggregate with a sidecar
+    lines = []
+    for histogram in (request_latency, request_queries, request_db_time):
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+def _query_budget(route: str) -> Optional[int]:
+    budget = ROUTE_QUERY_BUDGETS.get(route, DB_QUERY_BUDGET)
+    return budget or None
+
+def _check_request(method: str, route: str, stats: RequestStats):
+    statement, repeats = stats.repeated_statement()
+    if repeats >= N_PLUS_ONE_THRESHOLD:
+        logger.warning("Possible N+1 on %s %s: statement ran %d times: %s",
+                       method, route, repeats, statement[:200])
+    budget = _query_budget(route)
+    if budget is not None and stats.queries > budget:
+        message = (f"{method} {route} ran {stats.queries} queries (budget {budget}); "
+                   f"slowest {stats.slowest_seconds * 1000:.1f} ms: {(stats.slowest_statement or '')[:200]}")
+        if DB_QUERY_BUDGET_MODE == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning("Query budget exceeded: %s", message)
+
+class InstrumentationMiddleware:
+    """
+    Counts each request's SQL statements and DB time, reports them in a
+    Server-Timing header, records per-route histograms for /api/metrics and
+    applies the query budget. Plain ASGI, so streaming responses pass through.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        started_at = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - started_at
+                # Routing has filled in scope["route"] by the time the response starts
+                route = getattr(scope.get("route"), "path", "unmatched")
+                labels = (scope["method"], route, str(message["status"]))
+                request_latency.observe(labels, elapsed)
+                request_queries.observe(labels, stats.queries)
+                request_db_time.observe(labels, stats.db_seconds)
+                _check_request(scope["method"], route, stats)
+                # Durations only; statement text stays in the server logs
+                timing = (f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+                          f'db-slowest;dur={stats.slowest_seconds * 1000:.1f}, app;dur={elapsed * 1000:.1f}')
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
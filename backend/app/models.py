@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -22,6 +22,11 @@ class Client(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     created_by = Column(String, nullable=True)
 
+    __table_args__ = (
+        # A client is identified by (client_name, misc_info), case-insensitively; see logic.client_key_filter
+        Index("uq_clients_client_key", func.lower(client_name), func.lower(misc_info), unique=True),
+    )
+
 class Project(Base):
     __tablename__ = "projects"
 
@@ -45,6 +50,8 @@ class Master(Base):
     project_name = Column(String, nullable=False)
     misc_info = Column(String, nullable=False)
     client_code = Column(String, nullable=False) # Not unique in Master? Multiple projects can share client code? Yes.
+    client_id = Column(Integer, ForeignKey("clients.client_id"), nullable=True)
+    project_id = Column(Integer, ForeignKey("projects.project_id"), nullable=True, index=True)
     source = Column(String, nullable=True)
     brand = Column(String, nullable=True)
     country = Column(String, nullable=True)
@@ -53,3 +60,53 @@ class Master(Base):
     created_by = Column(String, nullable=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
     updated_by = Column(String, nullable=True)
+
+    project = relationship("Project")
+
+    __table_args__ = (
+        # A client's projects, newest first (latest project lookups)
+        Index("ix_master_client_id_master_id", client_id, master_id),
+        # Last change per row, for the incremental /projects/changes sync
+        Index("ix_master_changed_at", func.coalesce(updated_at, created_at)),
+    )
+
+class ClientCodeReservation(Base):
+    __tablename__ = "client_code_reservations"
+
+    # A previewed client code held for one user until expires_at, so concurrent
+    # previews and creates don't hand out the same code twice.
+    client_code = Column(String, primary_key=True)
+    client_name = Column(String, nullable=False)
+    misc_info = Column(String, nullable=False)
+    region = Column(String, nullable=False)
+    territory = Column(String, nullable=False)
+    reserved_by = Column(String, nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    # A background export/import run by app.jobs; status is one of
+    # "queued", "running", "succeeded", "failed"
+    job_id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    params = Column(JSON, nullable=True)
+    progress = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    artifact_path = Column(String, nullable=True)
+    artifact_name = Column(String, nullable=True)
+    created_by = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # Touched with each progress write; a queued/running job that stops beating was orphaned
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # A user's recent jobs
+        Index("ix_jobs_created_by_created_at", created_by, created_at),
+    )
@@ -0,0 +1,98 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from sqlalchemy.orm import Session
+from . import models
+
+# Off by default: another worker's new project only reaches this filter on reload,
+# so until then validation can call a just-taken name free (create still rejects it).
+PROJECT_FILTER_ENABLED = os.getenv("PROJECT_FILTER_ENABLED", "false").lower() in ("1", "true", "yes")
+PROJECT_FILTER_REFRESH_SECONDS = int(os.getenv("PROJECT_FILTER_REFRESH_SECONDS", "300"))
+PROJECT_FILTER_ERROR_RATE = 0.01
+PROJECT_FILTER_MIN_CAPACITY = 1024
+
+class ProjectFilter:
+    """
+    Bloom filter over taken project names and show codes. A miss means the value is
+    definitely free, so validation can skip the database; a hit still needs a query.
+    """
+    def __init__(self, enabled: bool = PROJECT_FILTER_ENABLED,
+                 refresh_seconds: int = PROJECT_FILTER_REFRESH_SECONDS):
+        self.enabled = enabled
+        self.refresh_seconds = refresh_seconds
+        self._bits = None
+        self._size = 0
+        self._hashes = 0
+        self._capacity = 0
+        self._count = 0
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def needs_load(self) -> bool:
+        if not self.enabled:
+            return False
+        return (self._loaded_at is None
+                or self._count > self._capacity
+                or time.monotonic() - self._loaded_at > self.refresh_seconds)
+
+    def load(self, db: Session):
+        total = db.query(models.Project).count()
+        # Sized for twice the current keys so local inserts don't degrade it before the next reload
+        capacity = max(PROJECT_FILTER_MIN_CAPACITY, 4 * total)
+        size = int(-capacity * math.log(PROJECT_FILTER_ERROR_RATE) / math.log(2) ** 2)
+        hashes = max(1, round(size / capacity * math.log(2)))
+        bits = bytearray((size + 7) // 8)
+        count = 0
+        rows = db.query(models.Project.project_name, models.Project.show_code).yield_per(5000)
+        for project_name, show_code in rows:
+            for key in (_name_key(project_name), _code_key(show_code)):
+                for position in _positions(key, size, hashes):
+                    bits[position >> 3] |= 1 << (position & 7)
+                count += 1
+        with self._lock:
+            self._bits, self._size, self._hashes = bits, size, hashes
+            self._capacity, self._count = capacity, count
+            self._loaded_at = time.monotonic()
+
+    def add(self, project_name: str, show_code: str):
+        if self._bits is None:
+            return
+        with self._lock:
+            for key in (_name_key(project_name), _code_key(show_code)):
+                for position in _positions(key, self._size, self._hashes):
+                    self._bits[position >> 3] |= 1 << (position & 7)
+                self._count += 1
+
+    def might_contain_name(self, project_name: str) -> bool:
+        return self._might_contain(_name_key(project_name))
+
+    def might_contain_code(self, show_code: str) -> bool:
+        return self._might_contain(_code_key(show_code))
+
+    def _might_contain(self, key: bytes) -> bool:
+        # Unloaded or disabled filters know nothing, so everything "might" be taken
+        if self._bits is None:
+            return True
+        with self._lock:
+            return all(
+                self._bits[position >> 3] & (1 << (position & 7))
+                for position in _positions(key, self._size, self._hashes)
+            )
+
+def _name_key(project_name: str) -> bytes:
+    return b"n:" + project_name.encode("utf-8")
+
+def _code_key(show_code: str) -> bytes:
+    return b"c:" + show_code.encode("utf-8")
+
+def _positions(key: bytes, size: int, hashes: int):
+    # Double hashing: k positions from two 64-bit halves of one digest
+    digest = hashlib.blake2b(key, digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % size for i in range(hashes)]
+
+project_filter = ProjectFilter()
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Backend, chosen with RESPONSE_CACHE_BACKEND:
+#   "memory" - per-worker LRU with TTL (default), for single-worker deployments. Tag
+#              generations are per process too, so a write only invalidates the worker
+#              that handled it; with several workers the TTL is capped (see below).
+#   "redis"  - shared across workers via RESPONSE_CACHE_URL (needs the `redis` package).
+#   "none"   - caching off.
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").strip().lower()
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "redis://localhost:6379/0")
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+# Worker processes (uvicorn and gunicorn both read WEB_CONCURRENCY). With more than one,
+# the memory backend keeps entries at most this long, bounding how long other workers
+# serve data (and match ETags) from before a write; use redis to cache for longer.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+RESPONSE_CACHE_MULTI_WORKER_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_MULTI_WORKER_TTL_SECONDS", "5"))
+
+class MemoryBackend:
+    """TTL + LRU map of key -> bytes, plus per-tag generation counters."""
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: int):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generations(self, tags: list) -> list:
+        with self._lock:
+            return [self._generations.get(tag, 0) for tag in tags]
+
+    def bump(self, tags: list):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+class RedisBackend:
+    """Shared backend: entries expire in Redis, generations are INCR counters."""
+    def __init__(self, url: str = RESPONSE_CACHE_URL):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(f"cache:{key}")
+
+    def set(self, key: str, value: bytes, ttl_seconds: int):
+        self._client.set(f"cache:{key}", value, ex=ttl_seconds)
+
+    def generations(self, tags: list) -> list:
+        return [int(g or 0) for g in self._client.mget([f"gen:{tag}" for tag in tags])]
+
+    def bump(self, tags: list):
+        pipe = self._client.pipeline()
+        for tag in tags:
+            pipe.incr(f"gen:{tag}")
+        pipe.execute()
+
+class ResponseCache:
+    """
+    Serialized responses keyed by endpoint + normalized params. Each entry is
+    filed under tags; invalidating a tag bumps its generation, which changes
+    the key of every entry under it, so stale entries are never read again
+    and simply age out.
+    """
+    def __init__(self, backend=None, ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None and self.ttl_seconds > 0
+
+    def key(self, endpoint: str, params: dict, tags: list) -> str:
+        normalized = sorted(
+            (name, value.strip() if isinstance(value, str) else value)
+            for name, value in params.items() if value not in (None, "")
+        )
+        material = json.dumps([normalized, tags, self.backend.generations(tags)], default=str)
+        return endpoint + ":" + hashlib.sha1(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[tuple]:
+        # Entries are stored as b"<etag>\n<body>"
+        value = self.backend.get(key)
+        if value is None:
+            return None
+        etag, _, body = value.partition(b"\n")
+        return etag.decode(), body
+
+    def set(self, key: str, etag: str, body: bytes):
+        self.backend.set(key, etag.encode() + b"\n" + body, self.ttl_seconds)
+
+    def invalidate(self, *tags: str):
+        if self.enabled and tags:
+            self.backend.bump(list(tags))
+
+def client_tag(client_name: str, misc_info: str) -> str:
+    return f"client:{client_name.lower()}|{misc_info.lower()}"
+
+def create_backend(name: str = RESPONSE_CACHE_BACKEND):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "redis":
+        return RedisBackend()
+    if name == "none":
+        return None
+    raise ValueError(f"Unsupported RESPONSE_CACHE_BACKEND: {name}")
+
+def default_ttl(name: str = RESPONSE_CACHE_BACKEND, workers: int = WEB_CONCURRENCY) -> int:
+    if name == "memory" and workers > 1 and RESPONSE_CACHE_TTL_SECONDS > RESPONSE_CACHE_MULTI_WORKER_TTL_SECONDS:
+        logger.warning(
+            "The memory response cache is per worker; capping its TTL at %ss for %s workers. "
+            "Set RESPONSE_CACHE_BACKEND=redis to share invalidations.",
+            RESPONSE_CACHE_MULTI_WORKER_TTL_SECONDS, workers
+        )
+        return RESPONSE_CACHE_MULTI_WORKER_TTL_SECONDS
+    return RESPONSE_CACHE_TTL_SECONDS
+
+response_cache = ResponseCache(create_backend(), default_ttl())
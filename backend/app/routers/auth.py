@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session
 from .. import database, schemas, models, auth
 
 router = APIRouter(
@@ -8,16 +8,28 @@ router = APIRouter(
     tags=["auth"]
 )
 
+def _update_password_hash(db: Session, username: str, password_hash: str):
+    db.query(models.User).filter(models.User.username == username) \
+        .update({models.User.password_hash: password_hash}, synchronize_session=False)
+    db.commit()
+
 @router.post("/login", response_model=schemas.Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
-    if not user or not auth.verify_password(form_data.password, user.password_hash):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), runner: database.SessionRunner = Depends(database.get_runner)):
+    user = await runner.run(auth.get_user, form_data.username)
+    # bcrypt is CPU-bound; it runs in the login hashing pool
+    if not user or not await auth.verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    username, role = user.username, user.role
+    if auth.needs_rehash(user.password_hash):
+        # Cost factor changed since this hash was stored: upgrade it now that we have the password
+        new_hash = await auth.get_password_hash_async(form_data.password)
+        await runner.run(_update_password_hash, username, new_hash)
+
     access_token = auth.create_access_token(
-        data={"sub": user.username, "role": user.role}
+        data={"sub": username, "role": role}
     )
-    return {"access_token": access_token, "token_type": "bearer", "role": user.role, "username": user.username}
+    return {"access_token": access_token, "token_type": "bearer", "role": role, "username": username}
@@ -1,9 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from sqlalchemy import case, func, literal, or_, select, text, true, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from .. import database, schemas, models, auth, logic
-import pandas as pd
-from io import BytesIO
+from .. import database, schemas, models, auth, logic, importer, jobs
+from ..client_index import client_index
+from ..events import project_events
+from ..jobs import JobContext, JobQueueFull, job_runner
+from ..project_filter import project_filter
+from ..response_cache import client_tag, response_cache
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pydantic import TypeAdapter
+import csv
+import hashlib
+import json
+import os
+import tempfile
+from io import StringIO
 
 router = APIRouter(
     prefix="/api/marketing",
@@ -11,59 +28,53 @@ router = APIRouter(
     dependencies=[Depends(auth.get_current_marketing_user)]
 )
 
-@router.post("/projects", response_model=schemas.MasterResponse)
-def create_project(project: schemas.ProjectCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    # 1. Validate duplicates
-    existing_project = db.query(models.Project).filter(
-        (models.Project.show_code == project.show_code) | 
-        (models.Project.project_name == project.project_name)
-    ).first()
-    
-    if existing_project:
-        raise HTTPException(status_code=400, detail="Project with this Show Code or Project Name already exists.")
+DUPLICATE_PROJECT_DETAIL = "Project with this Show Code or Project Name already exists."
 
-    # 2. Generate client_code (or reuse)
-    client_code = None
-    
-    # If frontend sent a previewed code, try to use it
-    if project.client_code:
-        # Check if this code is already taken by a DIFFERENT client
-        # (If it's the same client, we should reuse the existing code anyway, which logic.generate... does)
-        collision = db.query(models.Client).filter(
-            models.Client.client_code == project.client_code
-        ).first()
-        
-        # If no collision, OR if collision is with the SAME client (name + misc_info match), use it
-        if not collision:
-            client_code = project.client_code
-        elif collision.client_name == project.client_name and collision.misc_info == project.misc_info:
-            client_code = collision.client_code
-            
-    if not client_code:
-        client_code = logic.generate_unique_client_code(
-            db, 
-            project.client_name, 
-            project.region, 
-            project.territory, 
-            project.misc_info
-        )
+def _create_project(db: Session, project: schemas.ProjectCreate, current_user: schemas.Principal):
+    if db.get_bind().dialect.name == "postgresql":
+        # 1. One statement; uniqueness (projects, client codes, client keys) is enforced by constraints
+        values = project.dict(include=set(logic.MASTER_INSERT_COLUMNS))
+        values["created_by"] = current_user.username
+        row = db.execute(logic.create_project_statement(values, project.client_code, current_user.username)).one()
+        if row.new_project_id is None:
+            db.rollback()
+            raise HTTPException(status_code=400, detail=DUPLICATE_PROJECT_DETAIL)
+        if row.master_id is not None:
+            db.commit()
+            client_index.add(row.client_name, row.misc_info)
+            project_filter.add(row.project_name, row.show_code)
+            response_cache.invalidate("projects", client_tag(row.client_name, row.misc_info))
+            return row._mapping
 
-    # 3. Insert/Update Clients table
-    existing_client = db.query(models.Client).filter(
-        models.Client.client_name == project.client_name,
-        models.Client.misc_info == project.misc_info
-    ).first()
-    
-    if not existing_client:
-        new_client = models.Client(
-            client_name=project.client_name, 
-            client_code=client_code,
-            misc_info=project.misc_info,
-            created_by=current_user.username
+        # 2. New client without a usable previewed code, or created concurrently: take the locked path
+        db.rollback()
+    return _create_project_stepwise(db, project, current_user)
+
+def _create_project_stepwise(db: Session, project: schemas.ProjectCreate, current_user: schemas.Principal):
+    # 1. Concurrent creates of the same client wait for each other here; other clients don't
+    logic.lock_client_key(db, project.client_name, project.misc_info)
+
+    # 2. Reuse the client's code, or insert the client with the previewed (reserved) code
+    # or a freshly allocated one if that was lost
+    existing_client = logic.find_existing_client(db, project.client_name, project.misc_info)
+    if existing_client:
+        client_id, client_code = existing_client.client_id, existing_client.client_code
+    else:
+        inserted = logic.insert_client_with_code(
+            db,
+            project.client_name,
+            project.region,
+            project.territory,
+            project.misc_info,
+            username=current_user.username,
+            preferred_code=project.client_code
         )
-        db.add(new_client)
+        if not inserted:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Could not allocate a client code. Please retry.")
+        client_id, client_code = inserted
     
-    # 4. Insert into Master
+    # 3. Insert into Master
     new_master = models.Master(
         client_name=project.client_name,
         region=project.region,
@@ -72,6 +83,7 @@ def create_project(project: schemas.ProjectCreate, db: Session = Depends(databas
         show_code=project.show_code,
         project_name=project.project_name,
         misc_info=project.misc_info,
+        client_id=client_id,
         client_code=client_code,
         source=project.source,
         brand=project.brand,
@@ -79,32 +91,53 @@ def create_project(project: schemas.ProjectCreate, db: Session = Depends(databas
         creation_mode=project.creation_mode,
         created_by=current_user.username
     )
-    db.add(new_master)
 
-    # 5. Insert into Projects (if not exists)
-    new_project_entry = models.Project(
+    # 4. Linked Projects row; a duplicate name or show code fails on its unique constraint
+    new_master.project = models.Project(
         project_name=project.project_name,
         show_code=project.show_code,
         created_by=current_user.username
     )
-    db.add(new_project_entry)
+    db.add(new_master)
+    logic.release_holds(db, current_user.username)
     
-    db.commit()
-    db.refresh(new_master)
+    try:
+        # Server defaults come back with the INSERT (RETURNING), so no refresh is needed
+        db.flush()
+        created = schemas.MasterResponse.model_validate(new_master)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=DUPLICATE_PROJECT_DETAIL)
+    client_index.add(created.client_name, created.misc_info)
+    project_filter.add(created.project_name, created.show_code)
+    response_cache.invalidate("projects", client_tag(created.client_name, created.misc_info))
     
-    return new_master
+    return created
 
-@router.get("/projects", response_model=List[schemas.MasterResponse])
-def get_projects(
+def _publish_project(event_type: str, project):
+    project_events.publish(event_type, schemas.MasterResponse.model_validate(project).model_dump(mode="json"))
+
+@router.post("/projects", response_model=schemas.MasterResponse)
+async def create_project(project: schemas.ProjectCreate, runner: database.SessionRunner = Depends(database.get_runner), current_user: schemas.Principal = Depends(auth.get_current_marketing_user)):
+    created = await runner.run(_create_project, project, current_user)
+    _publish_project("created", created)
+    return created
+
+def _get_projects(
+    db: Session,
     skip: int = 0, 
     limit: int = 100, 
     client_name: Optional[str] = None,
     project_name: Optional[str] = None,
     show_code: Optional[str] = None,
     brand: Optional[str] = None,
-    db: Session = Depends(database.get_db)
+    q: Optional[str] = None,
 ):
     query = db.query(models.Master)
+    if q:
+        # Unified search across every text column, best matches first
+        query = query.filter(_search_criteria(q)).order_by(_search_rank(q))
     if client_name:
         query = query.filter(models.Master.client_name.ilike(f"%{client_name}%"))
     if project_name:
@@ -114,162 +147,822 @@ def get_projects(
     if brand:
         query = query.filter(models.Master.brand.ilike(f"%{brand}%"))
         
-    projects = query.offset(skip).limit(limit).all()
+    projects = query.order_by(models.Master.master_id.desc() if q else models.Master.master_id) \
+        .offset(skip).limit(limit).all()
     return projects
 
-@router.put("/projects/{master_id}", response_model=schemas.MasterResponse)
-def update_project(master_id: int, project_update: schemas.ProjectUpdate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+@router.get("/projects", response_model=List[schemas.MasterResponse])
+async def get_projects(
+    request: Request,
+    skip: int = 0, 
+    limit: int = 100, 
+    client_name: Optional[str] = None,
+    project_name: Optional[str] = None,
+    show_code: Optional[str] = None,
+    brand: Optional[str] = None,
+    q: Optional[str] = None,
+    runner: database.SessionRunner = Depends(database.get_runner)
+):
+    params = {"skip": skip, "limit": limit, "client_name": client_name, "project_name": project_name,
+              "show_code": show_code, "brand": brand, "q": q}
+    return await _cached_query(
+        request, runner, "projects", params, ["projects"], List[schemas.MasterResponse],
+        _get_projects, skip, limit, client_name, project_name, show_code, brand, q
+    )
+
+# Columns the dashboard search box can target
+SEARCH_FIELDS = {
+    "client_name": models.Master.client_name,
+    "client_code": models.Master.client_code,
+    "project_name": models.Master.project_name,
+    "show_code": models.Master.show_code,
+}
+# Columns covered by the unified `q` search (trigram GIN indexed on Postgres)
+Q_SEARCH_COLUMNS = [
+    models.Master.client_name,
+    models.Master.project_name,
+    models.Master.show_code,
+    models.Master.brand,
+    models.Master.client_code,
+]
+MAX_PAGE_SIZE = 500
+
+def _search_criteria(q: str):
+    # ILIKE '%q%' per column; on Postgres each branch is served by its pg_trgm index
+    return or_(*[column.ilike(f"%{q}%") for column in Q_SEARCH_COLUMNS])
+
+def _search_rank(q: str):
+    # 0 = exact match on any column, 1 = prefix match, 2 = substring match.
+    # Plain CASE keeps the ranking portable (SQLite has no similarity()).
+    term = q.lower()
+    return case(
+        (or_(*[func.lower(column) == term for column in Q_SEARCH_COLUMNS]), 0),
+        (or_(*[column.ilike(f"{q}%") for column in Q_SEARCH_COLUMNS]), 1),
+        else_=2,
+    )
+
+def _dashboard_criteria(
+    search: Optional[str] = None,
+    search_field: str = "client_name",
+    brand: Optional[str] = None,
+    region: Optional[str] = None,
+    creation_mode: Optional[str] = None,
+) -> list:
+    # Mirrors the dashboard's applyFilters: substring search on one field, exact match on the rest
+    if search_field not in SEARCH_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Unsupported search field: {search_field}")
+    criteria = []
+    if search:
+        criteria.append(SEARCH_FIELDS[search_field].ilike(f"%{search}%"))
+    if brand:
+        criteria.append(models.Master.brand == brand)
+    if region:
+        criteria.append(models.Master.region == region)
+    if creation_mode:
+        criteria.append(models.Master.creation_mode == creation_mode)
+    return criteria
+
+def _count_projects(db: Session, criteria: list, mode: str) -> Optional[int]:
+    if mode == "none":
+        return None
+    if mode == "estimated" and db.get_bind().dialect.name == "postgresql":
+        if not criteria:
+            # Planner statistics, no table scan
+            estimate = db.execute(text(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = 'master'::regclass"
+            )).scalar()
+            if estimate is not None and estimate >= 0:
+                return int(estimate)
+        else:
+            stmt = db.query(models.Master.master_id).filter(*criteria).statement
+            dialect = db.get_bind().dialect
+            compiled = stmt.compile(dialect=dialect)
+            params = compiled.params
+            if dialect.positional:
+                params = tuple(params[name] for name in compiled.positiontup)
+            plan = db.connection().exec_driver_sql(
+                "EXPLAIN (FORMAT JSON) " + str(compiled), params
+            ).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+    return db.query(func.count(models.Master.master_id)).filter(*criteria).scalar()
+
+def _get_projects_page(
+    db: Session,
+    cursor: Optional[int] = None,
+    limit: int = 100,
+    search: Optional[str] = None,
+    search_field: str = "client_name",
+    brand: Optional[str] = None,
+    region: Optional[str] = None,
+    creation_mode: Optional[str] = None,
+    count: str = "none",
+):
+    # Keyset pagination, newest first. `cursor` is the last master_id of the previous page,
+    # so every page is an index range scan on the primary key however deep it is.
+    if count not in ("none", "exact", "estimated"):
+        raise HTTPException(status_code=400, detail="count must be one of: none, exact, estimated")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    criteria = _dashboard_criteria(search, search_field, brand, region, creation_mode)
+
+    query = db.query(models.Master).filter(*criteria)
+    if cursor is not None:
+        query = query.filter(models.Master.master_id < cursor)
+    rows = query.order_by(models.Master.master_id.desc()).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    return {
+        "items": items,
+        "next_cursor": items[-1].master_id if has_more else None,
+        "total": _count_projects(db, criteria, count),
+        "total_is_estimate": count == "estimated" and db.get_bind().dialect.name == "postgresql",
+    }
+
+@router.get("/projects/page", response_model=schemas.ProjectPage)
+async def get_projects_page(
+    request: Request,
+    cursor: Optional[int] = None,
+    limit: int = 100,
+    search: Optional[str] = None,
+    search_field: str = "client_name",
+    brand: Optional[str] = None,
+    region: Optional[str] = None,
+    creation_mode: Optional[str] = None,
+    count: str = "none",
+    runner: database.SessionRunner = Depends(database.get_runner)
+):
+    params = {"cursor": cursor, "limit": limit, "search": search, "search_field": search_field,
+              "brand": brand, "region": region, "creation_mode": creation_mode, "count": count}
+    return await _cached_query(
+        request, runner, "projects/page", params, ["projects"], schemas.ProjectPage,
+        _get_projects_page, cursor, limit, search, search_field, brand, region, creation_mode, count
+    )
+
+def _get_project_facets(
+    db: Session,
+    search: Optional[str] = None,
+    search_field: str = "client_name",
+    brand: Optional[str] = None,
+    region: Optional[str] = None,
+    creation_mode: Optional[str] = None,
+):
+    # Faceted counts for the dashboard cards: each facet respects every filter except its own
+    filters = {"brand": brand, "region": region, "creation_mode": creation_mode}
+    facets = {}
+    for field in filters:
+        others = {k: (None if k == field else v) for k, v in filters.items()}
+        criteria = _dashboard_criteria(search, search_field, **others)
+        column = getattr(models.Master, field)
+        rows = db.query(column, func.count(models.Master.master_id)) \
+            .filter(*criteria).filter(column.isnot(None)).group_by(column).all()
+        facets[field] = [{"value": value, "count": n} for value, n in rows]
+
+    criteria = _dashboard_criteria(search, search_field, brand, region, creation_mode)
+    total, clients = db.query(
+        func.count(models.Master.master_id),
+        func.count(func.distinct(models.Master.client_name))
+    ).filter(*criteria).one()
+    return {"total": total, "clients": clients, **facets}
+
+@router.get("/projects/facets", response_model=schemas.ProjectFacets)
+async def get_project_facets(
+    request: Request,
+    search: Optional[str] = None,
+    search_field: str = "client_name",
+    brand: Optional[str] = None,
+    region: Optional[str] = None,
+    creation_mode: Optional[str] = None,
+    runner: database.SessionRunner = Depends(database.get_runner)
+):
+    params = {"search": search, "search_field": search_field, "brand": brand, "region": region,
+              "creation_mode": creation_mode}
+    return await _cached_query(
+        request, runner, "projects/facets", params, ["projects"], schemas.ProjectFacets,
+        _get_project_facets, search, search_field, brand, region, creation_mode
+    )
+
+# Rows changed this long before the cursor are sent again, so a write that committed
+# after a sync but was stamped before it is still picked up. Clients merge by master_id.
+CHANGES_OVERLAP = timedelta(seconds=10)
+
+def _get_project_changes(db: Session, since: Optional[str] = None, limit: int = MAX_PAGE_SIZE):
+    # 1. The cursor is the database clock, so app servers' clocks don't matter
+    cursor = db.query(func.now()).scalar().isoformat()
+    if since is None:
+        return {"items": [], "cursor": cursor}
+    try:
+        since_at = datetime.fromisoformat(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    # 2. Range scan on ix_master_changed_at: cost follows the number of changed rows
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    changed_at = func.coalesce(models.Master.updated_at, models.Master.created_at)
+    rows = db.query(models.Master).filter(changed_at > since_at - CHANGES_OVERLAP) \
+        .order_by(changed_at, models.Master.master_id).limit(limit + 1).all()
+    return {"items": rows[:limit], "cursor": cursor, "truncated": len(rows) > limit}
+
+@router.get("/projects/changes", response_model=schemas.ProjectChanges)
+async def get_project_changes(
+    since: Optional[str] = None,
+    limit: int = MAX_PAGE_SIZE,
+    runner: database.SessionRunner = Depends(database.get_runner)
+):
+    # Incremental sync for the dashboard; without `since` only a starting cursor is returned
+    return await runner.run(_get_project_changes, since, limit)
+
+def _duplicate_detail(error: IntegrityError) -> str:
+    # Both backends name the violated column in the message
+    message = str(error.orig)
+    if "project_name" in message:
+        return "Project Name already exists"
+    if "show_code" in message:
+        return "Show Code already exists"
+    return DUPLICATE_PROJECT_DETAIL
+
+def _cascade_project_keys(db: Session, master_ids, username: Optional[str]):
+    # Copy name/show code from Master onto the linked Projects rows in one UPDATE ... FROM
+    db.execute(
+        update(models.Project)
+        .where(models.Project.project_id == models.Master.project_id, models.Master.master_id.in_(master_ids))
+        .values(
+            project_name=models.Master.project_name,
+            show_code=models.Master.show_code,
+            updated_by=username
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+def _update_project(db: Session, master_id: int, project_update: schemas.ProjectUpdate, current_user: schemas.Principal):
     db_project = db.query(models.Master).filter(models.Master.master_id == master_id).first()
     if not db_project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # If client_name or misc_info changes, we might need to update client_code?
-    # The prompt says: "Respect new client-code reuse logic if client_name or misc_info changes"
-    
+    # Respect client-code reuse logic if client_name or misc_info changes
     recalc_code = False
     if (project_update.client_name and project_update.client_name != db_project.client_name) or \
        (project_update.misc_info and project_update.misc_info != db_project.misc_info):
         recalc_code = True
-        
+    rename = (project_update.project_name and project_update.project_name != db_project.project_name) or \
+             (project_update.show_code and project_update.show_code != db_project.show_code)
+    previous_client = client_tag(db_project.client_name or "", db_project.misc_info or "")
+    if rename and db_project.project_id is None:
+        # Legacy rows the backfill could not link have no Projects row for the constraints to catch
+        if project_update.project_name and project_update.project_name != db_project.project_name and \
+           db.query(models.Project.project_id).filter(models.Project.project_name == project_update.project_name).first():
+            raise HTTPException(status_code=400, detail="Project Name already exists")
+        if project_update.show_code and project_update.show_code != db_project.show_code and \
+           db.query(models.Project.project_id).filter(models.Project.show_code == project_update.show_code).first():
+            raise HTTPException(status_code=400, detail="Show Code already exists")
+
     # Update fields
     update_data = project_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_project, key, value)
         
     if recalc_code:
-        # Recalculate client code
-        new_code = logic.generate_unique_client_code(
-            db,
-            db_project.client_name,
-            db_project.region,
-            db_project.territory,
-            db_project.misc_info
-        )
-        db_project.client_code = new_code
-        
-        # Also ensure this new client combo exists in Clients table
-        existing_client = db.query(models.Client).filter(
-            models.Client.client_name == db_project.client_name,
-            models.Client.misc_info == db_project.misc_info
-        ).first()
-        
-        if not existing_client:
-            new_client = models.Client(
-                client_name=db_project.client_name, 
-                client_code=new_code,
-                misc_info=db_project.misc_info,
-                created_by=current_user.username
+        # Recalculate client code: reuse the matching client's, or register a new client
+        logic.lock_client_key(db, db_project.client_name, db_project.misc_info)
+        existing_client = logic.find_existing_client(db, db_project.client_name, db_project.misc_info)
+        if existing_client:
+            db_project.client_id, db_project.client_code = existing_client.client_id, existing_client.client_code
+        else:
+            inserted = logic.insert_client_with_code(
+                db,
+                db_project.client_name,
+                db_project.region,
+                db_project.territory,
+                db_project.misc_info,
+                username=current_user.username
             )
-            db.add(new_client)
-
-    # Update Project table if names changed
-    if project_update.project_name:
-        existing_p = db.query(models.Project).filter(models.Project.project_name == project_update.project_name).first()
-        if existing_p and existing_p.project_name != db_project.project_name:
-             raise HTTPException(status_code=400, detail="Project Name already exists")
-        
-        p_entry = db.query(models.Project).filter(models.Project.project_name == db_project.project_name).first()
-        if p_entry:
-            p_entry.project_name = project_update.project_name
-            p_entry.updated_by = current_user.username
-            
-    if project_update.show_code:
-        existing_s = db.query(models.Project).filter(models.Project.show_code == project_update.show_code).first()
-        if existing_s and existing_s.show_code != db_project.show_code:
-             raise HTTPException(status_code=400, detail="Show Code already exists")
-             
-        p_entry = db.query(models.Project).filter(models.Project.show_code == db_project.show_code).first()
-        if p_entry:
-            p_entry.show_code = project_update.show_code
-            p_entry.updated_by = current_user.username
+            if not inserted:
+                db.rollback()
+                raise HTTPException(status_code=409, detail="Could not allocate a client code. Please retry.")
+            db_project.client_id, db_project.client_code = inserted
 
     db_project.updated_by = current_user.username
+    try:
+        db.flush()
+        # Renames reach Projects through the foreign key; clashes fail on its unique constraints
+        if rename:
+            _cascade_project_keys(db, [master_id], current_user.username)
+        updated = schemas.MasterResponse.model_validate(db_project)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=_duplicate_detail(e))
+    if recalc_code:
+        client_index.add(updated.client_name, updated.misc_info)
+    if rename:
+        project_filter.add(updated.project_name, updated.show_code)
+    # Client details come from the latest project, so both the old and new client may change
+    response_cache.invalidate(
+        "projects", previous_client, client_tag(updated.client_name or "", updated.misc_info or "")
+    )
+    return updated
+
+MAX_BULK_UPDATE_ROWS = 5000
+
+def _bulk_update_projects(db: Session, bulk: schemas.ProjectBulkUpdate, current_user: schemas.Principal):
+    changes = bulk.changes.dict(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="No changes given.")
+    if not bulk.master_ids and not bulk.client_code:
+        raise HTTPException(status_code=400, detail="Give master_ids or client_code to select the rows.")
+    if bulk.master_ids and len(bulk.master_ids) > MAX_BULK_UPDATE_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_UPDATE_ROWS} master_ids per request.")
+    # An explicit null for a NOT NULL column would fail the UPDATE
+    required = [k for k, v in changes.items() if v is None and not models.Master.__table__.c[k].nullable]
+    if required:
+        raise HTTPException(status_code=400, detail=f"{', '.join(required)} cannot be null.")
+
+    # One UPDATE for every selected row, however many there are
+    stmt = update(models.Master).values(**changes, updated_by=current_user.username) \
+        .execution_options(synchronize_session=False)
+    if bulk.master_ids:
+        stmt = stmt.where(models.Master.master_id.in_(bulk.master_ids))
+    if bulk.client_code:
+        client_id = select(models.Client.client_id).where(models.Client.client_code == bulk.client_code)
+        stmt = stmt.where(models.Master.client_id == client_id.scalar_subquery())
+    result = db.execute(stmt)
     db.commit()
-    db.refresh(db_project)
-    return db_project
+    if result.rowcount:
+        # Region/territory/country may have changed for any client, so drop every client's details
+        response_cache.invalidate("projects", "client-details")
+    return {"updated": result.rowcount}
+
+@router.put("/projects/{master_id}", response_model=schemas.MasterResponse)
+async def update_project(master_id: int, project_update: schemas.ProjectUpdate, runner: database.SessionRunner = Depends(database.get_runner), current_user: schemas.Principal = Depends(auth.get_current_marketing_user)):
+    updated = await runner.run(_update_project, master_id, project_update, current_user)
+    _publish_project("updated", updated)
+    return updated
+
+@router.patch("/projects", response_model=schemas.BulkUpdateResult)
+async def bulk_update_projects(bulk: schemas.ProjectBulkUpdate, runner: database.SessionRunner = Depends(database.get_runner), current_user: schemas.Principal = Depends(auth.get_current_marketing_user)):
+    # Re-tag many rows at once, e.g. a brand or territory change across a whole client
+    result = await runner.run(_bulk_update_projects, bulk, current_user)
+    if result["updated"]:
+        # Too many rows to push; dashboards pull them from /projects/changes
+        project_events.publish("changed", result)
+    return result
+
+# Columns written by the export, in output order. Audit columns are left out.
+EXPORT_COLUMNS = [
+    "master_id", "client_name", "client_code", "region", "territory", "country",
+    "currency", "show_code", "project_name", "misc_info", "source", "brand",
+    "creation_mode",
+]
+EXPORT_BATCH_SIZE = 1000
+
+def _iter_export_rows(batch_size: int = EXPORT_BATCH_SIZE):
+    # Own session: the request-scoped one may be closed before the body is streamed.
+    # stream_results uses a server-side cursor on Postgres, so only one batch is in memory.
+    db = database.SessionLocal()
+    try:
+        columns = [getattr(models.Master, c) for c in EXPORT_COLUMNS]
+        query = db.query(*columns).order_by(models.Master.master_id) \
+            .execution_options(stream_results=True).yield_per(batch_size)
+        for row in query:
+            yield row
+    finally:
+        db.close()
+
+def _iter_export_batches(db: Session, batch_size: int = EXPORT_BATCH_SIZE):
+    # Keyset pages, each in its own short transaction: a long export holds no snapshot
+    # (vacuum on Postgres, writers on SQLite) and its progress writes land between pages
+    columns = [getattr(models.Master, c) for c in EXPORT_COLUMNS]
+    last_id = None
+    while True:
+        query = db.query(*columns).order_by(models.Master.master_id)
+        if last_id is not None:
+            query = query.filter(models.Master.master_id > last_id)
+        rows = query.limit(batch_size).all()
+        db.commit()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1].master_id
+
+def _stream_csv(batch_size: int = EXPORT_BATCH_SIZE):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    for row in _iter_export_rows(batch_size):
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+def _stream_xlsx(batch_size: int = EXPORT_BATCH_SIZE, chunk_size: int = 64 * 1024):
+    # Write-only mode flushes rows to disk as they are appended; the zip container
+    # can only be finalised at the end, so the file is spooled and then streamed.
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("projects")
+    ws.append(EXPORT_COLUMNS)
+    for row in _iter_export_rows(batch_size):
+        ws.append(list(row))
+
+    with tempfile.TemporaryFile() as tmp:
+        wb.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+@router.get("/projects/events")
+async def project_event_stream(runner: database.SessionRunner = Depends(database.get_runner)):
+    # Server-sent events: "created"/"updated" carry the row, "changed" means many rows
+    # changed and should be pulled from /projects/changes. Subscribe before releasing the
+    # session so nothing published in between is missed.
+    queue = project_events.subscribe()
+    await runner.release()
+    return StreamingResponse(
+        project_events.stream(queue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/projects/export")
-def export_projects(db: Session = Depends(database.get_db)):
-    projects = db.query(models.Master).all()
-    data = [p.__dict__ for p in projects]
-    for d in data:
-        d.pop('_sa_instance_state', None)
-        d.pop('created_at', None)
-        d.pop('created_by', None)
-        d.pop('updated_at', None)
-        d.pop('updated_by', None)
+def export_projects(format: str = "csv"):
+    if format == "csv":
+        return StreamingResponse(
+            _stream_csv(),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=projects.csv"}
+        )
+    if format == "xlsx":
+        return StreamingResponse(
+            _stream_xlsx(),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={"Content-Disposition": "attachment; filename=projects.xlsx"}
+        )
+    raise HTTPException(status_code=400, detail="Unsupported export format. Use 'csv' or 'xlsx'.")
+
+MAX_VALIDATION_ITEMS = 5000
+
+def _validate_projects(db: Session, items: list) -> list:
+    # 1. Values the filter has never seen are definitely free; only the rest hit the DB
+    names = {i.project_name for i in items if i.project_name and project_filter.might_contain_name(i.project_name)}
+    codes = {i.show_code for i in items if i.show_code and project_filter.might_contain_code(i.show_code)}
+
+    # 2. One set-based query for everything else
+    taken_names, taken_codes = set(), set()
+    if names or codes:
+        criteria = []
+        if names:
+            criteria.append(models.Project.project_name.in_(names))
+        if codes:
+            criteria.append(models.Project.show_code.in_(codes))
+        for name, code in db.query(models.Project.project_name, models.Project.show_code).filter(or_(*criteria)):
+            taken_names.add(name)
+            taken_codes.add(code)
+
+    # 3. Also flag values repeated within the request (bulk pre-checks)
+    name_counts = Counter(i.project_name for i in items if i.project_name)
+    code_counts = Counter(i.show_code for i in items if i.show_code)
+    results = []
+    for item in items:
+        errors = {}
+        if item.project_name in taken_names:
+            errors["project_name"] = "Project Name already exists"
+        elif item.project_name and name_counts[item.project_name] > 1:
+            errors["project_name"] = "Project Name is repeated in this batch"
+        if item.show_code in taken_codes:
+            errors["show_code"] = "Show Code already exists"
+        elif item.show_code and code_counts[item.show_code] > 1:
+            errors["show_code"] = "Show Code is repeated in this batch"
+        results.append({"project_name": item.project_name, "show_code": item.show_code, "errors": errors})
+    return results
+
+async def _ensure_project_filter(runner: database.SessionRunner):
+    if project_filter.needs_load:
+        await runner.run(project_filter.load)
+
+def _get_client_details(db: Session, client_name: str, misc_info: str):
+    # Find the most recent project of this client
+    # We order by master_id desc to get the latest one
+    existing = db.query(models.Master).join(
+        models.Client, models.Client.client_id == models.Master.client_id
+    ).filter(
+        *logic.client_key_filter(client_name, misc_info)
+    ).order_by(models.Master.master_id.desc()).first()
     
-    df = pd.DataFrame(data)
-    stream = BytesIO()
-    df.to_csv(stream, index=False)
+    if existing:
+        return {
+            "region": existing.region,
+            "territory": existing.territory,
+            "country": existing.country
+        }
     
-    return Response(
-        content=stream.getvalue(),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=projects.csv"}
-    )
+    return {}
+
+def _get_client_context(db: Session, client_name: str, misc_info: str, region: Optional[str],
+                        territory: Optional[str], username: str):
+    context = {"misc_infos": client_index.misc_infos(client_name)}
+    if not misc_info:
+        return context
+
+    # 1. Existing client code and its latest project's details in one statement
+    client = db.query(models.Client).filter(*logic.client_key_filter(client_name, misc_info))
+    existing_code = client.with_entities(models.Client.client_code).scalar_subquery()
+    latest = db.query(models.Master.region, models.Master.territory, models.Master.country).filter(
+        models.Master.client_id == client.with_entities(models.Client.client_id).scalar_subquery()
+    ).order_by(models.Master.master_id.desc()).limit(1).subquery()
+    row = db.query(existing_code, latest.c.region, latest.c.territory, latest.c.country).select_from(
+        select(literal(1)).subquery().outerjoin(latest, true())
+    ).one()
+    code, context["region"], context["territory"], context["country"] = row
+
+    # 2. Reuse the client's code, or preview one once region/territory are chosen. Read-only:
+    # this runs per keystroke, so holding a code for every partial name would waste candidates
+    if code:
+        context.update(client_code=code, reused=True)
+    elif (region or context["region"]) and (territory or context["territory"]):
+        context["client_code"] = logic.peek_preview_code(
+            db, client_name, region or context["region"], territory or context["territory"], misc_info, username
+        )
+    return context
+
+MAX_CLIENT_NAME_RESULTS = 100
+CLIENT_LOOKUP_CACHE_CONTROL = "private, max-age=30"
+
+def _etag(body: bytes) -> str:
+    return 'W/"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+def _cached_json(request: Request, payload, cache_control: str):
+    # Conditional GET: the ETag is derived from the payload, so it agrees across workers
+    etag = _etag(json.dumps(payload).encode("utf-8"))
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(payload, headers=headers)
+
+@lru_cache(maxsize=None)
+def _adapter(response_type) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+async def _cached_query(request: Request, runner: database.SessionRunner, endpoint: str, params: dict,
+                        tags: list, response_type, fn, *args):
+    # Serialized response from the cache, or from fn on a miss. The key is taken before
+    # the query runs, so a write that lands meanwhile files this result under a dead key.
+    # `Cache-Control: no-cache` from the client skips the lookup (e.g. right after a save).
+    cached, key = None, None
+    if response_cache.enabled:
+        key = response_cache.key(endpoint, params, tags)
+        if "no-cache" not in request.headers.get("cache-control", ""):
+            cached = response_cache.get(key)
+    if cached:
+        etag, body = cached
+    else:
+        adapter = _adapter(response_type)
+        result = await runner.run(fn, *args)
+        body = adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+        etag = _etag(body)
+        if key:
+            response_cache.set(key, etag, body)
+
+    # Browsers revalidate every time; unchanged results cost a 304 and no query
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+async def _ensure_client_index(runner: database.SessionRunner):
+    if client_index.needs_load:
+        await runner.run(client_index.load)
+
+@router.post("/projects/import", response_model=schemas.ImportReport)
+async def import_projects(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    runner: database.SessionRunner = Depends(database.get_runner),
+    current_user: schemas.Principal = Depends(auth.get_current_marketing_user)
+):
+    # Same CSV/XLSX layout as /projects/export; valid rows are imported, the rest reported
+    if not (file.filename or "").lower().endswith((".csv", ".xlsx")):
+        raise HTTPException(status_code=400, detail="Upload a .csv or .xlsx file.")
+    try:
+        report = await runner.run(
+            importer.import_projects, file.file, file.filename, current_user.username, dry_run
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if report["imported"] and not dry_run:
+        project_events.publish("changed", {"imported": report["imported"]})
+    return report
+
+# Background jobs: the export/import runs on the job runner's pool, not in the request.
+# Submit returns 202 with the job; poll /jobs/{job_id}, then fetch /jobs/{job_id}/download.
+EXPORT_FORMATS = ("csv", "xlsx")
+MAX_LISTED_JOBS = 20
+
+@job_runner.handler("export")
+def _run_export_job(db: Session, job: JobContext, format: str = "csv"):
+    total = _count_projects(db, [], "estimated")
+    db.commit()
+    rows = job.track(_iter_export_batches(db), total, every=EXPORT_BATCH_SIZE)
+    filename = f"projects.{format}"
+    path = job.path(filename)
+    if format == "xlsx":
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("projects")
+        ws.append(EXPORT_COLUMNS)
+        for row in rows:
+            ws.append(list(row))
+        wb.save(path)
+    else:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            writer.writerows(rows)
+    job.set_artifact(path, filename)
+    return {"rows": job.done}
+
+@job_runner.handler("import")
+def _run_import_job(db: Session, job: JobContext, upload: str, filename: str, dry_run: bool = False):
+    try:
+        with open(job.path(upload), "rb") as f:
+            report = importer.import_projects(db, f, filename, job.created_by, dry_run, on_progress=job.progress)
+    finally:
+        os.remove(job.path(upload))
+    if report["imported"] and not dry_run:
+        job.call_in_loop(project_events.publish, "changed", {"imported": report["imported"]})
+    return report
+
+def _submit_job(db: Session, kind: str, params: dict, username: str, job_id: Optional[str] = None):
+    job = job_runner.submit(db, kind, params, username, job_id)
+    return schemas.JobStatus.model_validate(job)
+
+async def _submit(runner: database.SessionRunner, kind: str, params: dict, username: str,
+                  job_id: Optional[str] = None):
+    try:
+        return await runner.run(_submit_job, kind, params, username, job_id)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+def _get_job(db: Session, job_id: str, username: str) -> models.Job:
+    # Jobs are private to their creator; someone else's id looks the same as a missing one
+    job = db.get(models.Job, job_id)
+    if job is None or job.created_by != username:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def _get_job_status(db: Session, job_id: str, username: str):
+    return schemas.JobStatus.model_validate(_get_job(db, job_id, username))
+
+def _list_jobs(db: Session, username: str):
+    rows = db.query(models.Job).filter(models.Job.created_by == username) \
+        .order_by(models.Job.created_at.desc()).limit(MAX_LISTED_JOBS).all()
+    return [schemas.JobStatus.model_validate(job) for job in rows]
+
+def _get_job_artifact(db: Session, job_id: str, username: str):
+    job = _get_job(db, job_id, username)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}.")
+    if not job.artifact_path:
+        raise HTTPException(status_code=410, detail="This job's file has expired or it produced none.")
+    if not os.path.exists(job.artifact_path):
+        raise HTTPException(status_code=404, detail="This job's file is not on this server.")
+    return job.artifact_path, job.artifact_name
+
+@router.post("/jobs/export", response_model=schemas.JobStatus, status_code=202)
+async def submit_export_job(format: str = "csv", runner: database.SessionRunner = Depends(database.get_runner), current_user: schemas.Principal = Depends(auth.get_current_marketing_user)):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported export format. Use 'csv' or 'xlsx'.")
+    return await _submit(runner, "export", {"format": format}, current_user.username)
+
+@router.post("/jobs/import", response_model=schemas.JobStatus, status_code=202)
+async def submit_import_job(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    runner: database.SessionRunner = Depends(database.get_runner),
+    current_user: schemas.Principal = Depends(auth.get_current_marketing_user)
+):
+    if not (file.filename or "").lower().endswith((".csv", ".xlsx")):
+        raise HTTPException(status_code=400, detail="Upload a .csv or .xlsx file.")
+    job_id = jobs.new_job_id()
+    upload = await run_in_threadpool(jobs.save_upload, job_id, file.file, file.filename)
+    params = {"upload": upload, "filename": file.filename, "dry_run": dry_run}
+    try:
+        return await _submit(runner, "import", params, current_user.username, job_id)
+    except BaseException:
+        await run_in_threadpool(jobs.discard_files, job_id)
+        raise
+
+@router.get("/jobs", response_model=List[schemas.JobStatus])
+async def list_jobs(runner: database.SessionRunner = Depends(database.get_runner), current_user: schemas.Principal = Depends(auth.get_current_marketing_user)):
+    # The caller's most recent jobs, newest first
+    return await runner.run(_list_jobs, current_user.username)
+
+@router.get("/jobs/{job_id}", response_model=schemas.JobStatus)
+async def get_job(job_id: str, response: Response, runner: database.SessionRunner = Depends(database.get_runner), current_user: schemas.Principal = Depends(auth.get_current_marketing_user)):
+    response.headers["Cache-Control"] = "no-store"
+    return await runner.run(_get_job_status, job_id, current_user.username)
+
+@router.get("/jobs/{job_id}/download")
+async def download_job_artifact(job_id: str, runner: database.SessionRunner = Depends(database.get_runner), current_user: schemas.Principal = Depends(auth.get_current_marketing_user)):
+    path, filename = await runner.run(_get_job_artifact, job_id, current_user.username)
+    return FileResponse(path, filename=filename)
 
 @router.get("/preview-client-code", response_model=schemas.ClientCodePreview)
-def preview_client_code(
+async def preview_client_code(
     client_name: str,
     region: str,
     territory: str,
     misc_info: str,
-    db: Session = Depends(database.get_db)
+    runner: database.SessionRunner = Depends(database.get_runner),
+    current_user: schemas.Principal = Depends(auth.get_current_marketing_user)
 ):
-    code = logic.preview_client_code_logic(db, client_name, region, territory, misc_info)
+    # Reserves the code for this user, so the create that follows can use it
+    code = await runner.run(
+        logic.preview_client_code_logic, client_name, region, territory, misc_info, current_user.username
+    )
+    if not code:
+        raise HTTPException(status_code=409, detail="Could not reserve a client code. Please retry.")
     return {"client_code": code}
+
 @router.get("/validate-project")
-def validate_project(
+async def validate_project(
     project_name: Optional[str] = None,
     show_code: Optional[str] = None,
-    db: Session = Depends(database.get_db)
+    runner: database.SessionRunner = Depends(database.get_runner)
 ):
-    errors = {}
-    if project_name:
-        exists = db.query(models.Project).filter(models.Project.project_name == project_name).first()
-        if exists:
-            errors["project_name"] = "Project Name already exists"
-            
-    if show_code:
-        exists = db.query(models.Project).filter(models.Project.show_code == show_code).first()
-        if exists:
-            errors["show_code"] = "Show Code already exists"
-            
-    return {"errors": errors}
+    await _ensure_project_filter(runner)
+    item = schemas.ProjectKey(project_name=project_name, show_code=show_code)
+    results = await runner.run(_validate_projects, [item])
+    return {"errors": results[0]["errors"]}
+
+@router.post("/projects/validate", response_model=schemas.ProjectValidationResponse)
+async def validate_projects(
+    request: schemas.ProjectValidationRequest,
+    runner: database.SessionRunner = Depends(database.get_runner)
+):
+    # Batch form of /validate-project: many (project_name, show_code) pairs, one query
+    if len(request.items) > MAX_VALIDATION_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_VALIDATION_ITEMS} items per request.")
+    await _ensure_project_filter(runner)
+    return {"results": await runner.run(_validate_projects, request.items)}
 
 @router.get("/client-details", response_model=schemas.ClientDetailsResponse)
-def get_client_details(
+async def get_client_details(
+    request: Request,
     client_name: str,
     misc_info: str,
-    db: Session = Depends(database.get_db)
+    runner: database.SessionRunner = Depends(database.get_runner)
 ):
-    # Find the most recent project with this client_name and misc_info
-    # We order by master_id desc to get the latest one
-    existing = db.query(models.Master).filter(
-        models.Master.client_name == client_name,
-        models.Master.misc_info == misc_info
-    ).order_by(models.Master.master_id.desc()).first()
-    
-    if existing:
-        return {
-            "region": existing.region,
-            "territory": existing.territory,
-            "country": existing.country
-        }
-    
-    return {}
+    # Client names are matched case-insensitively, so the cache key is too
+    params = {"client_name": client_name.lower(), "misc_info": misc_info.lower()}
+    return await _cached_query(
+        request, runner, "client-details", params, ["client-details", client_tag(client_name, misc_info)],
+        schemas.ClientDetailsResponse, _get_client_details, client_name, misc_info
+    )
+
+@router.get("/client-context", response_model=schemas.ClientContext)
+async def get_client_context(
+    client_name: str,
+    misc_info: str = "",
+    region: Optional[str] = None,
+    territory: Optional[str] = None,
+    runner: database.SessionRunner = Depends(database.get_runner),
+    current_user: schemas.Principal = Depends(auth.get_current_marketing_user)
+):
+    # Everything the project form needs per keystroke: known misc_infos, autofill
+    # details, and the client code (reused, or previewed without reserving it)
+    await _ensure_client_index(runner)
+    return await runner.run(
+        _get_client_context, client_name, misc_info, region, territory, current_user.username
+    )
 
 @router.get("/clients/names", response_model=List[str])
-def get_client_names(db: Session = Depends(database.get_db)):
-    # Get unique client names from Client table
-    clients = db.query(models.Client.client_name).distinct().all()
-    return [c[0] for c in clients]
+async def get_client_names(
+    request: Request,
+    prefix: str = "",
+    limit: int = 20,
+    runner: database.SessionRunner = Depends(database.get_runner)
+):
+    # Typeahead over the in-process client index: case-insensitive prefix match, alphabetical
+    await _ensure_client_index(runner)
+    names = client_index.search(prefix, max(1, min(limit, MAX_CLIENT_NAME_RESULTS)))
+    return _cached_json(request, names, CLIENT_LOOKUP_CACHE_CONTROL)
 
 @router.get("/clients/misc-infos", response_model=List[str])
-def get_client_misc_infos(client_name: str, db: Session = Depends(database.get_db)):
-    # Get unique misc_infos for a specific client
-    infos = db.query(models.Client.misc_info).filter(
-        models.Client.client_name == client_name
-    ).distinct().all()
-    return [i[0] for i in infos]
+async def get_client_misc_infos(
+    request: Request,
+    client_name: str,
+    runner: database.SessionRunner = Depends(database.get_runner)
+):
+    await _ensure_client_index(runner)
+    return _cached_json(request, client_index.misc_infos(client_name), CLIENT_LOOKUP_CACHE_CONTROL)
@@ -13,6 +13,11 @@ class TokenData(BaseModel):
     username: Optional[str] = None
     role: Optional[str] = None
 
+class Principal(BaseModel):
+    # Verified identity of the caller, as stored in the users table
+    username: str
+    role: str
+
 class UserLogin(BaseModel):
     username: str
     password: str
@@ -44,6 +49,23 @@ class ProjectUpdate(BaseModel):
     brand: Optional[str] = None
     country: Optional[str] = None
 
+class ProjectTagUpdate(BaseModel):
+    # Fields that can change across many rows without touching client codes or project keys
+    region: Optional[str] = None
+    territory: Optional[str] = None
+    currency: Optional[str] = None
+    source: Optional[str] = None
+    brand: Optional[str] = None
+    country: Optional[str] = None
+
+class ProjectBulkUpdate(BaseModel):
+    master_ids: Optional[List[int]] = None
+    client_code: Optional[str] = None
+    changes: ProjectTagUpdate
+
+class BulkUpdateResult(BaseModel):
+    updated: int
+
 class MasterResponse(BaseModel):
     master_id: int
     client_name: Optional[str] = None
@@ -66,10 +88,83 @@ class MasterResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ProjectPage(BaseModel):
+    items: List[MasterResponse]
+    next_cursor: Optional[int] = None
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+
+class ProjectChanges(BaseModel):
+    # Rows created or updated since the given cursor; pass `cursor` back as `since` next time.
+    # truncated means more rows changed than fit, so reload the list instead.
+    items: List[MasterResponse]
+    cursor: str
+    truncated: bool = False
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class ProjectFacets(BaseModel):
+    total: int
+    clients: int
+    brand: List[FacetCount]
+    region: List[FacetCount]
+    creation_mode: List[FacetCount]
+
+class ImportRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+class ImportReport(BaseModel):
+    imported: int
+    failed: int
+    dry_run: bool = False
+    errors: List[ImportRowError]
+
+class JobStatus(BaseModel):
+    # A background export/import; poll until status is "succeeded" or "failed".
+    # total is an estimate while running; result holds e.g. the import report.
+    job_id: str
+    kind: str
+    status: str
+    progress: int = 0
+    total: Optional[int] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    artifact_name: Optional[str] = None
+    created_by: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class ClientCodePreview(BaseModel):
     client_code: str
 
+class ProjectKey(BaseModel):
+    project_name: Optional[str] = None
+    show_code: Optional[str] = None
+
+class ProjectValidationRequest(BaseModel):
+    items: List[ProjectKey]
+
+class ProjectValidationResult(ProjectKey):
+    errors: dict = {}
+
+class ProjectValidationResponse(BaseModel):
+    results: List[ProjectValidationResult]
+
 class ClientDetailsResponse(BaseModel):
     region: Optional[str] = None
     territory: Optional[str] = None
     country: Optional[str] = None
+
+class ClientContext(ClientDetailsResponse):
+    # client_code is the existing client's code when reused, otherwise an unreserved
+    # preview (None until region and territory are known)
+    client_code: Optional[str] = None
+    reused: bool = False
+    misc_infos: List[str] = []
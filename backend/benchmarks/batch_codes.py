@@ -0,0 +1,103 @@
+"""
+Batch client code benchmark.
+
+Compares candidate generation for a batch of new clients done row by row
+with the scalar functions (get_candidate_slices + construct_code) against
+the column-wise logic.batch_code_candidates (after checking both agree on
+very long names), then times the whole
+logic.allocate_client_codes (candidates, one pass of IN queries, collision
+resolution) on a scratch database that already holds --existing clients.
+
+Usage (from the backend directory):
+    python -m benchmarks.batch_codes --clients 50000 --candidates 32
+    python -m benchmarks.batch_codes --url postgresql+psycopg2://... --clients 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import logic, models
+from benchmarks.seed_data import make_clients
+
+
+def scalar_candidates(clients, limit):
+    return [
+        [logic.construct_code(slice_3, region, territory, misc_info)
+         for slice_3 in logic.get_candidate_slices(name, limit)]
+        for name, region, territory, misc_info in clients
+    ]
+
+
+def batch_candidates(clients, limit):
+    names, regions, territories, misc_infos = zip(*clients)
+    return logic.batch_code_candidates(names, regions, territories, misc_infos, limit)
+
+
+def check_long_names(limit, rng, lengths=(100, 200, 400, 1000)):
+    # Batch unranking must pick the same slices as the scalar path however long the name
+    clients = [("".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ ") for _ in range(length)), "North", "Delhi", "ID")
+               for length in lengths]
+    assert batch_candidates(clients, limit) == scalar_candidates(clients, limit), \
+        "batch and scalar candidates differ for long names"
+
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="scratch database URL (default: temporary SQLite file)")
+    parser.add_argument("--clients", type=int, default=50000)
+    parser.add_argument("--existing", type=int, default=20000, help="clients already in the database")
+    parser.add_argument("--candidates", type=int, default=32, help="candidates per client")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    check_long_names(args.candidates, random.Random(args.seed))
+    clients = make_clients(args.clients, "N", rng)
+
+    scalar = best_of(lambda: scalar_candidates(clients, args.candidates), args.repeats)
+    batch = best_of(lambda: batch_candidates(clients, args.candidates), args.repeats)
+    print(f"candidates for {args.clients} clients: scalar loop {scalar:.2f}s, "
+          f"batch {batch:.2f}s ({scalar / batch:.1f}x)")
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'batch_codes.db')}"
+    engine = create_engine(url)
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    existing = make_clients(args.existing, "E", rng)
+    codes = logic.allocate_client_codes(session, [(*client, None) for client in existing])
+    session.bulk_insert_mappings(models.Client, [
+        {"client_name": name, "client_code": code, "misc_info": misc_info}
+        for (name, _, _, misc_info), code in zip(existing, codes)
+    ])
+    session.commit()
+
+    start = time.perf_counter()
+    codes = logic.allocate_client_codes(
+        session, [(*client, None) for client in clients], candidates_per_client=args.candidates
+    )
+    elapsed = time.perf_counter() - start
+    assert len(set(codes)) == len(codes), "allocate_client_codes handed out a code twice"
+    print(f"{engine.dialect.name}: allocate_client_codes for {args.clients} clients against "
+          f"{args.existing} existing in {elapsed:.2f}s ({args.clients / elapsed:.0f} clients/s)")
+    session.close()
+    models.Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Bulk import throughput benchmark.
+
+Generates a CSV in the export layout and runs it through
+importer.import_projects against a scratch database, reporting rows/s.
+
+Usage (from the backend directory):
+    python -m benchmarks.bulk_import --rows 20000 --clients 2000
+    python -m benchmarks.bulk_import --url postgresql+psycopg2://... --rows 50000
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import importer, models
+
+WORDS = ["Studio", "Pictures", "Films", "Media", "Entertainment", "Global", "Bright", "Red", "Blue",
+         "North", "Phantom", "Pixel", "Lotus", "Tiger", "Orbit", "Nova", "Silver", "Harbor"]
+TERRITORIES = {"Domestic": ["Chennai", "Hyderabad", "Mumbai", "Bangalore"],
+               "International": ["USA", "UK", "Canada", "Europe", "China", "Others"]}
+
+
+def make_csv(rows, clients, rng):
+    names = [" ".join(rng.sample(WORDS, 2)) + f" {i}" for i in range(clients)]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(importer.REQUIRED_COLUMNS + ["brand", "country"])
+    for i in range(rows):
+        region = rng.choice(list(TERRITORIES))
+        writer.writerow([
+            rng.choice(names), region, rng.choice(TERRITORIES[region]), "USD",
+            f"SC{i:07d}", f"Project {i}", rng.choice(["ID", "TS", "NX", "SP"]),
+            rng.choice(["PFX", "Milk", "Spectre"]), "India",
+        ])
+    return buffer.getvalue().encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="scratch database URL (default: temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bulk_import.db')}"
+    engine = create_engine(url)
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    data = make_csv(args.rows, args.clients, random.Random(args.seed))
+    start = time.perf_counter()
+    report = importer.import_projects(session, io.BytesIO(data), "bench.csv", username="bench")
+    elapsed = time.perf_counter() - start
+
+    print(f"{engine.dialect.name}: imported={report['imported']} failed={report['failed']} "
+          f"in {elapsed:.2f}s ({report['imported'] / elapsed:.0f} rows/s)")
+    session.close()
+    models.Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
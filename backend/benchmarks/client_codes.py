@@ -0,0 +1,87 @@
+"""
+Client code generation benchmark.
+
+Seeds a scratch database with a crowded code namespace (a fraction of every
+possible XXX-RT-MI slice for a few client names already taken) and measures
+queries and latency per call to logic.generate_unique_client_code.
+
+Usage (from the backend directory):
+    python -m benchmarks.client_codes --density 0.9 --calls 200
+    python -m benchmarks.client_codes --url postgresql+psycopg2://... --density 1.0
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import logic, models
+
+NAMES = ["Kabilarasan", "Netflix", "Sofia", "Amazon Studios", "Warner Bros Pictures"]
+REGION, TERRITORY, MISC = "Domestic", "Chennai", "ID"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def seed(session, density, rng):
+    codes = set()
+    for name in NAMES:
+        cleaned = logic.clean_string(name)
+        for combo in itertools.combinations(range(len(cleaned)), 3):
+            if rng.random() < density:
+                slice_3 = "".join(cleaned[i] for i in combo)
+                codes.add(logic.construct_code(slice_3, REGION, TERRITORY, MISC))
+    session.bulk_insert_mappings(models.Client, [
+        {"client_name": f"Seed {i}", "client_code": code, "misc_info": MISC}
+        for i, code in enumerate(sorted(codes))
+    ])
+    session.commit()
+    return len(codes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="scratch database URL (default: temporary SQLite file)")
+    parser.add_argument("--density", type=float, default=0.9, help="fraction of possible codes already taken")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'client_codes.db')}"
+    engine = create_engine(url)
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    taken = seed(session, args.density, random.Random(args.seed))
+    print(f"Seeded {taken} taken codes (density {args.density}) on {engine.dialect.name}")
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+    latencies, query_counts = [], []
+    for i in range(args.calls):
+        name = NAMES[i % len(NAMES)]
+        statements.clear()
+        start = time.perf_counter()
+        logic.generate_unique_client_code(session, name, REGION, TERRITORY, MISC)
+        latencies.append((time.perf_counter() - start) * 1000)
+        query_counts.append(len(statements))
+
+    print(f"calls={args.calls}  queries/call mean={statistics.mean(query_counts):.1f} max={max(query_counts)}  "
+          f"p50={percentile(latencies, 50):.2f}ms  p99={percentile(latencies, 99):.2f}ms")
+    session.close()
+    models.Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Concurrent project creation stress test.
+
+Fires many parallel preview + create requests, several per client, with
+client names chosen so their code candidates overlap. Checks that every
+create succeeds, each client ends up with exactly one code, and no two
+clients share one.
+
+Usage (server running, users seeded with `python -m app.seed_users`):
+    python -m benchmarks.concurrent_creates --base-url http://localhost:8000 --creates 300 --clients 30
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def call(base_url, method, path, token=None, params=None, payload=None, form=None):
+    url = f"{base_url}{path}"
+    if params:
+        url += "?" + urllib.parse.urlencode(params)
+    headers = {}
+    data = None
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    if payload is not None:
+        headers["Content-Type"] = "application/json"
+        data = json.dumps(payload).encode()
+    if form is not None:
+        data = urllib.parse.urlencode(form).encode()
+    request = urllib.request.Request(url, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode(errors="replace")
+
+
+def create_one(base_url, token, run_id, index, client_name):
+    project = {
+        "client_name": client_name,
+        "region": "Domestic",
+        "territory": "Chennai",
+        "currency": "INR",
+        "misc_info": "ID",
+        "country": "India",
+        "show_code": f"{run_id}-S{index}",
+        "project_name": f"{run_id} Project {index}",
+    }
+    start = time.perf_counter()
+    status, body = call(base_url, "GET", "/api/marketing/preview-client-code", token, params={
+        k: project[k] for k in ("client_name", "region", "territory", "misc_info")
+    })
+    if status == 200:
+        project["client_code"] = body["client_code"]
+    status, body = call(base_url, "POST", "/api/marketing/projects", token, payload=project)
+    return status, body, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="marketing_user")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--creates", type=int, default=300)
+    parser.add_argument("--clients", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    status, body = call(args.base_url, "POST", "/api/auth/login",
+                        form={"username": args.username, "password": args.password})
+    if status != 200:
+        raise SystemExit(f"Login failed with HTTP {status}")
+    token = body["access_token"]
+
+    run_id = uuid.uuid4().hex[:6].upper()
+    # Near-identical names share most of their 3-letter slices, so their codes collide
+    names = [f"Stress {run_id} Studio {chr(65 + i % 26)}{i // 26}" for i in range(args.clients)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(
+            lambda i: create_one(args.base_url, token, run_id, i, names[i % len(names)]),
+            range(args.creates)
+        ))
+    elapsed = time.perf_counter() - start
+
+    statuses = Counter(status for status, _, _ in results)
+    latencies = [ms for _, _, ms in results]
+    codes_by_client = defaultdict(set)
+    for status, body, _ in results:
+        if status == 200:
+            codes_by_client[body["client_name"]].add(body["client_code"])
+
+    split_clients = [name for name, codes in codes_by_client.items() if len(codes) > 1]
+    code_owners = Counter(code for codes in codes_by_client.values() for code in codes)
+    shared_codes = [code for code, owners in code_owners.items() if owners > 1]
+
+    print(f"creates={args.creates} clients={args.clients} concurrency={args.concurrency}")
+    print(f"statuses: {dict(statuses)}  throughput={args.creates / elapsed:.1f}/s  "
+          f"p50={percentile(latencies, 50):.1f}ms  p99={percentile(latencies, 99):.1f}ms  "
+          f"mean={statistics.mean(latencies):.1f}ms")
+    print(f"clients with more than one code: {len(split_clients)}  codes shared by clients: {len(shared_codes)}")
+    for status, body, _ in results:
+        if status != 200:
+            print(f"first failure: HTTP {status} {body}")
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Create-project round-trip benchmark.
+
+Runs the create path in-process against DATABASE_URL (Postgres) and reports,
+per path, the database round trips per create (statements plus BEGIN/COMMIT/
+ROLLBACK) and the latency. --latency-ms adds a sleep to every round trip to
+simulate a hosted database. Compares the single-statement path with the
+stepwise one it replaced; half the creates reuse an existing client, half
+create a new client with a previewed code.
+
+Usage:
+    DATABASE_URL=postgresql://... python -m benchmarks.create_project --creates 200 --latency-ms 20
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from sqlalchemy import event
+
+from app import database, logic, models, schemas
+from app.routers import marketing
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class RoundTrips:
+    """Counts (and optionally delays) every round trip the engine makes."""
+
+    def __init__(self, engine, latency_ms):
+        self.count = 0
+        self.delay = latency_ms / 1000
+        for name in ("before_cursor_execute", "begin", "commit", "rollback"):
+            event.listen(engine, name, self._hit)
+
+    def _hit(self, *args, **kwargs):
+        self.count += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+
+def make_project(run_id, index, reuse):
+    client_name = f"Bench Reuse {run_id}" if reuse else f"Bench {run_id} {index}"
+    return schemas.ProjectCreate(
+        client_name=client_name,
+        region="Domestic",
+        territory="Chennai",
+        currency="INR",
+        misc_info="ID",
+        country="India",
+        show_code=f"{run_id}-S{index}",
+        project_name=f"{run_id} Project {index}",
+    )
+
+
+def run(path, creates, trips, user):
+    run_id = uuid.uuid4().hex[:8]
+    counts, latencies = [], []
+    for index in range(creates):
+        project = make_project(run_id, index, reuse=index % 2 == 0)
+        db = database.SessionLocal()
+        try:
+            if index % 2:
+                # Preview first, as the form does; not part of the measured create
+                project.client_code = logic.reserve_preview_code(
+                    db, project.client_name, project.region, project.territory, project.misc_info, user.username
+                )
+            elif index == 0:
+                # Make sure the reused client exists before measuring
+                marketing._create_project_stepwise(db, make_project(run_id, "seed", reuse=True), user)
+            trips.count = 0
+            start = time.perf_counter()
+            path(db, project, user)
+            latencies.append((time.perf_counter() - start) * 1000)
+            counts.append(trips.count)
+        finally:
+            db.close()
+    return counts, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--creates", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    if database.engine.dialect.name != "postgresql":
+        raise SystemExit("The single-statement path is Postgres-only; point DATABASE_URL at Postgres.")
+    models.Base.metadata.create_all(bind=database.engine)
+    trips = RoundTrips(database.engine, args.latency_ms)
+    user = schemas.Principal(username="bench", role="marketing")
+
+    for label, path in (("stepwise", marketing._create_project_stepwise),
+                        ("single statement", marketing._create_project)):
+        counts, latencies = run(path, args.creates, trips, user)
+        print(f"{label:>16}: round trips/create mean {statistics.mean(counts):.1f} "
+              f"(min {min(counts)}, max {max(counts)}), latency p50 {percentile(latencies, 50):.1f} ms, "
+              f"p95 {percentile(latencies, 95):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
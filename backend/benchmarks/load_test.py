@@ -0,0 +1,302 @@
+"""
+Mixed-workload load test for the marketing API.
+
+Drives a weighted mix of login, list, search, preview-code, validate, create,
+update and export requests at a fixed concurrency for a fixed time, and writes
+per-operation p50/p95/p99 latency, throughput, errors and mean queries per
+request (from the Server-Timing header) as JSON. --compare diffs two result
+files and exits non-zero when an operation regressed beyond --threshold.
+
+Usage (server running on a database seeded with benchmarks.seed_data):
+    python -m benchmarks.load_test --base-url http://localhost:8000 --concurrency 32 --duration 60 --output before.json
+    python -m benchmarks.load_test --mix list=50,search=30,create=20 --output after.json
+    python -m benchmarks.load_test --compare before.json after.json --threshold 10
+"""
+import argparse
+import json
+import platform
+import random
+import re
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MIX = "list=30,search=25,validate=15,preview=10,create=8,update=8,login=3,export=1"
+SAMPLE_ROWS = 500
+MIN_REQUESTS_TO_COMPARE = 20
+QUERY_COUNT = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def call(base_url, method, path, token=None, params=None, payload=None, form=None):
+    url = f"{base_url}{path}"
+    if params:
+        url += "?" + urllib.parse.urlencode(params)
+    headers = {}
+    data = None
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    if payload is not None:
+        headers["Content-Type"] = "application/json"
+        data = json.dumps(payload).encode()
+    if form is not None:
+        data = urllib.parse.urlencode(form).encode()
+    request = urllib.request.Request(url, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(request) as response:
+            body = response.read()
+            queries = QUERY_COUNT.search(response.headers.get("Server-Timing", ""))
+            is_json = response.headers.get_content_type() == "application/json"
+            return response.status, json.loads(body) if is_json else body, int(queries.group(1)) if queries else None
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode(errors="replace"), None
+
+
+class Workload:
+    """The operations in the mix. Each returns (status, queries) for one logical request."""
+
+    def __init__(self, base_url, username, password, run_id):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.run_id = run_id
+        self.samples = []
+        self._counter = iter(range(10**9))
+        self._lock = threading.Lock()
+        status, body, _ = self._login()
+        if status != 200:
+            raise SystemExit(f"Login as {username} failed with HTTP {status}")
+        self.token = body["access_token"]
+
+    def _login(self):
+        return call(self.base_url, "POST", "/api/auth/login",
+                    form={"username": self.username, "password": self.password})
+
+    def _next(self):
+        with self._lock:
+            return next(self._counter)
+
+    def login(self, rng):
+        status, _, queries = self._login()
+        return status, queries
+
+    def list(self, rng):
+        status, _, queries = call(self.base_url, "GET", "/api/marketing/projects/page", self.token,
+                                  params={"limit": 100, "count": "exact"})
+        return status, queries
+
+    def search(self, rng):
+        term = rng.choice(self.samples)["client_name"].split()[0][:rng.randint(2, 5)]
+        status, _, queries = call(self.base_url, "GET", "/api/marketing/projects/page", self.token,
+                                  params={"search": term, "limit": 100, "count": "estimated"})
+        return status, queries
+
+    def validate(self, rng):
+        sample = rng.choice(self.samples)
+        project_name = sample["project_name"] if rng.random() < 0.5 else f"Free {uuid.uuid4().hex[:8]}"
+        status, _, queries = call(self.base_url, "GET", "/api/marketing/validate-project", self.token,
+                                  params={"project_name": project_name, "show_code": sample["show_code"]})
+        return status, queries
+
+    def preview(self, rng):
+        sample = rng.choice(self.samples)
+        status, _, queries = call(self.base_url, "GET", "/api/marketing/preview-client-code", self.token, params={
+            "client_name": f"{sample['client_name'].split()[0]} Load {self.run_id}{self._next()}",
+            "region": sample["region"], "territory": sample["territory"], "misc_info": sample["misc_info"],
+        })
+        return status, queries
+
+    def create(self, rng):
+        sample = rng.choice(self.samples)
+        index = self._next()
+        # Half reuse an existing client, half create a new one after previewing its code
+        project = {
+            "client_name": sample["client_name"] if index % 2 else f"Load {self.run_id} Client {index}",
+            "region": sample["region"], "territory": sample["territory"], "currency": sample["currency"],
+            "misc_info": sample["misc_info"], "country": sample["country"] or "India",
+            "show_code": f"L{self.run_id}-{index}", "project_name": f"Load {self.run_id} Project {index}",
+        }
+        queries = 0
+        if not index % 2:
+            status, body, preview_queries = call(self.base_url, "GET", "/api/marketing/preview-client-code",
+                                                 self.token, params={k: project[k] for k in
+                                                                     ("client_name", "region", "territory", "misc_info")})
+            queries += preview_queries or 0
+            if status == 200:
+                project["client_code"] = body["client_code"]
+        status, _, create_queries = call(self.base_url, "POST", "/api/marketing/projects", self.token, payload=project)
+        return status, queries + (create_queries or 0)
+
+    def update(self, rng):
+        sample = rng.choice(self.samples)
+        status, _, queries = call(self.base_url, "PUT", f"/api/marketing/projects/{sample['master_id']}",
+                                  self.token, payload={"brand": rng.choice(["PFX", "Milk", "Spectre"])})
+        return status, queries
+
+    def export(self, rng):
+        status, _, queries = call(self.base_url, "GET", "/api/marketing/projects/export", self.token)
+        return status, queries
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if not hasattr(Workload, name.strip()) or name.startswith("_"):
+            raise SystemExit(f"Unknown operation in --mix: {name}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def run(workload, mix, concurrency, duration, warmup, seed):
+    names, weights = list(mix), list(mix.values())
+    results = []
+    lock = threading.Lock()
+    started_at = time.perf_counter()
+    measure_from = started_at + warmup
+    stop_at = measure_from + duration
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        local = []
+        while True:
+            begin = time.perf_counter()
+            if begin >= stop_at:
+                break
+            name = rng.choices(names, weights)[0]
+            try:
+                status, queries = getattr(workload, name)(rng)
+            except OSError as e:
+                status, queries = f"error: {e.__class__.__name__}", None
+            if begin >= measure_from:
+                local.append((name, (time.perf_counter() - begin) * 1000, status, queries))
+        with lock:
+            results.extend(local)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    return results
+
+
+def summarize(results, duration):
+    by_op = defaultdict(list)
+    for name, ms, status, queries in results:
+        by_op[name].append((ms, status, queries))
+
+    def stats(rows):
+        latencies = [ms for ms, _, _ in rows]
+        statuses = Counter(str(status) for _, status, _ in rows)
+        queries = [q for _, _, q in rows if q is not None]
+        return {
+            "requests": len(rows),
+            "errors": sum(n for status, n in statuses.items() if not status.startswith("2")),
+            "throughput_rps": round(len(rows) / duration, 2),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "mean_ms": round(statistics.mean(latencies), 2),
+            "db_queries_mean": round(statistics.mean(queries), 2) if queries else None,
+            "statuses": dict(statuses),
+        }
+
+    return {
+        "summary": stats([(ms, status, queries) for _, ms, status, queries in results]) if results else {},
+        "operations": {name: stats(rows) for name, rows in sorted(by_op.items())},
+    }
+
+
+def compare(before_path, after_path, threshold):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def change(old, new):
+        return (new - old) / old * 100 if old else 0.0
+
+    regressions = []
+    print(f"{'operation':<10} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18} {'req/s':>18} {'errors':>10}")
+    for name in sorted(set(before["operations"]) | set(after["operations"])):
+        old, new = before["operations"].get(name), after["operations"].get(name)
+        if not old or not new:
+            print(f"{name:<10} only in {'after' if new else 'before'}")
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            cells.append(f"{old[key]:.1f}->{new[key]:.1f} ({change(old[key], new[key]):+.0f}%)")
+        print(f"{name:<10} " + " ".join(f"{c:>18}" for c in cells) + f" {old['errors']:>4}->{new['errors']:<4}")
+        if min(old["requests"], new["requests"]) < MIN_REQUESTS_TO_COMPARE:
+            continue
+        if change(old["p95_ms"], new["p95_ms"]) > threshold:
+            regressions.append(f"{name}: p95 {old['p95_ms']:.1f} -> {new['p95_ms']:.1f} ms")
+        if change(old["throughput_rps"], new["throughput_rps"]) < -threshold:
+            regressions.append(f"{name}: throughput {old['throughput_rps']} -> {new['throughput_rps']} req/s")
+        if new["errors"] / new["requests"] > old["errors"] / old["requests"]:
+            regressions.append(f"{name}: error rate up ({old['errors']} -> {new['errors']})")
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="bench_user_0")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation=weight pairs")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=60, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds first")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two result files")
+    parser.add_argument("--threshold", type=float, default=10, help="regression threshold, percent")
+    args = parser.parse_args()
+
+    if args.compare:
+        raise SystemExit(compare(*args.compare, args.threshold))
+
+    mix = parse_mix(args.mix)
+    run_id = uuid.uuid4().hex[:6].upper()
+    workload = Workload(args.base_url, args.username, args.password, run_id)
+    status, page, _ = call(args.base_url, "GET", "/api/marketing/projects/page", workload.token,
+                           params={"limit": SAMPLE_ROWS})
+    if status != 200 or not page["items"]:
+        raise SystemExit("No projects to sample; seed the database with benchmarks.seed_data first.")
+    workload.samples = page["items"]
+
+    results = run(workload, mix, args.concurrency, args.duration, args.warmup, args.seed)
+    report = {
+        "meta": {
+            "base_url": args.base_url, "mix": mix, "concurrency": args.concurrency,
+            "duration_s": args.duration, "warmup_s": args.warmup, "seed": args.seed,
+            "run_id": run_id, "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "client_host": platform.node(),
+        },
+        **summarize(results, args.duration),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        summary = report["summary"]
+        print(f"{summary.get('requests', 0)} requests, {summary.get('throughput_rps', 0)} req/s, "
+              f"p50 {summary.get('p50_ms')} ms, p95 {summary.get('p95_ms')} ms, p99 {summary.get('p99_ms')} ms "
+              f"-> {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
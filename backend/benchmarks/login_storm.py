@@ -0,0 +1,98 @@
+"""
+Login storm load test.
+
+Measures the latency of a cheap authenticated endpoint on its own, then again
+while a burst of concurrent logins (bcrypt) hits the same server. With login
+hashing in its own process pool the two should stay close; logins beyond
+LOGIN_MAX_PENDING are answered with 503 instead of queueing.
+
+Usage (server running, users seeded with `python -m app.seed_users`):
+    python -m benchmarks.login_storm --base-url http://localhost:8000 --logins 200 --concurrency 50
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def login(base_url, username, password):
+    body = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    request = urllib.request.Request(f"{base_url}/api/auth/login", data=body, method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, None
+
+
+def probe(base_url, token, path):
+    request = urllib.request.Request(f"{base_url}{path}", headers={"Authorization": f"Bearer {token}"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return (time.perf_counter() - start) * 1000
+
+
+def probe_for(base_url, token, path, stop, interval=0.02):
+    samples = []
+    while not stop.is_set():
+        samples.append(probe(base_url, token, path))
+        time.sleep(interval)
+    return samples
+
+
+def report(label, samples):
+    print(f"{label:<16} n={len(samples):<5} p50={percentile(samples, 50):8.2f}ms  "
+          f"p99={percentile(samples, 99):8.2f}ms  mean={statistics.mean(samples):8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="marketing_user")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--probe-path", default="/api/marketing/clients/misc-infos?client_name=__probe__")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    status, body = login(args.base_url, args.username, args.password)
+    if status != 200:
+        raise SystemExit(f"Initial login failed with HTTP {status}")
+    token = body["access_token"]
+
+    baseline = [probe(args.base_url, token, args.probe_path) for _ in range(100)]
+    report("idle", baseline)
+
+    stop = threading.Event()
+    samples = []
+    prober = threading.Thread(target=lambda: samples.extend(probe_for(args.base_url, token, args.probe_path, stop)))
+    prober.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        statuses = Counter(pool.map(
+            lambda _: login(args.base_url, args.username, args.password)[0], range(args.logins)
+        ))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    prober.join()
+
+    report("during storm", samples)
+    print(f"logins: {dict(statuses)} in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s)")
+
+
+if __name__ == "__main__":
+    main()
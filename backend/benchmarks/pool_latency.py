@@ -0,0 +1,68 @@
+"""
+Connection pool latency benchmark.
+
+Simulates request handlers that check out a connection, run a handful of
+queries and release it, first with NullPool (a new connection per request)
+and then with the pool selected by DB_POOL_MODE / DB_POOL_*.
+
+Usage (from the backend directory):
+    python -m benchmarks.pool_latency --requests 200 --concurrency 8
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.database import SQLALCHEMY_DATABASE_URL, get_engine_options, get_pool_mode
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def simulate_request(engine, queries):
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        for _ in range(queries):
+            conn.execute(text("SELECT 1")).scalar()
+    return (time.perf_counter() - start) * 1000
+
+
+def run(label, engine, requests, concurrency, queries):
+    # Warm up so the pooled engine starts with open connections, as it would in steady state
+    for _ in range(concurrency):
+        simulate_request(engine, 1)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(lambda _: simulate_request(engine, queries), range(requests)))
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+
+    print(f"{label:<12} p50={percentile(samples, 50):8.2f}ms  p99={percentile(samples, 99):8.2f}ms  "
+          f"mean={statistics.mean(samples):8.2f}ms  throughput={requests / elapsed:8.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=6, help="queries per simulated request")
+    args = parser.parse_args()
+
+    url = SQLALCHEMY_DATABASE_URL
+    print(f"Benchmarking {args.requests} requests x {args.queries} queries, concurrency {args.concurrency}")
+
+    run("null", create_engine(url, poolclass=NullPool, pool_pre_ping=True),
+        args.requests, args.concurrency, args.queries)
+    run(get_pool_mode(url), create_engine(url, **get_engine_options(url)),
+        args.requests, args.concurrency, args.queries)
+
+
+if __name__ == "__main__":
+    main()
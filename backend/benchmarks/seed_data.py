@@ -0,0 +1,143 @@
+"""
+Benchmark data seeder.
+
+Fills users, clients, projects and master at a chosen scale (master rows) for
+the load test. Client popularity follows a Zipf-like curve, so a few clients
+own many projects and most own one or two, as in production. Client codes
+come from logic.allocate_client_codes, so they follow the real rules and
+collide the way real ones do. Seeded users share one password.
+
+Usage (from the backend directory; the server under test must use the same database):
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.seed_data --scale 10k
+    python -m benchmarks.seed_data --url postgresql+psycopg2://... --scale 1M --reset
+"""
+import argparse
+import itertools
+import os
+import random
+import time
+
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import auth, logic, models
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+PROJECTS_PER_CLIENT = 10
+ZIPF_EXPONENT = 1.1
+BATCH_SIZE = 5000
+BENCH_USERS = 20
+BENCH_PASSWORD = "bench-password"
+
+FIRST_WORDS = ["Red", "Blue", "Silver", "North", "Phantom", "Pixel", "Lotus", "Tiger", "Orbit", "Nova",
+               "Harbor", "Bright", "Golden", "Crimson", "Eastern", "Royal", "Lunar", "Vertex", "Cedar", "Falcon"]
+SECOND_WORDS = ["Studios", "Pictures", "Films", "Media", "Entertainment", "Productions", "Animation",
+                "Networks", "Labs", "Works", "Digital", "Creative", "Stories", "Vision", "Frames"]
+TERRITORIES = {"Domestic": ["Chennai", "Hyderabad", "Mumbai", "Bangalore"],
+               "International": ["USA", "UK", "Canada", "Europe", "China", "Others"]}
+MISC_INFOS = ["ID", "TS", "NX", "SP"]
+BRANDS = ["PFX", "Milk", "Spectre"]
+
+
+def make_clients(count, run_id, rng):
+    # Distinct (name, misc_info) keys; names reuse a small vocabulary, so code candidates overlap
+    clients = []
+    for i in range(count):
+        region = rng.choice(list(TERRITORIES))
+        name = f"{rng.choice(FIRST_WORDS)} {rng.choice(SECOND_WORDS)} {run_id}{i}"
+        clients.append((name, region, rng.choice(TERRITORIES[region]), rng.choice(MISC_INFOS)))
+    return clients
+
+
+def seed_users(session):
+    existing = {username for (username,) in session.query(models.User.username)}
+    missing = [f"bench_user_{i}" for i in range(BENCH_USERS) if f"bench_user_{i}" not in existing]
+    if missing:
+        password_hash = auth.get_password_hash(BENCH_PASSWORD)
+        session.execute(insert(models.User), [
+            {"username": username, "password_hash": password_hash, "role": "marketing", "created_by": "seed"}
+            for username in missing
+        ])
+        session.commit()
+
+
+def seed_clients(session, clients):
+    # Codes are allocated a batch at a time against what is already in the table
+    ids = []
+    for start in range(0, len(clients), BATCH_SIZE):
+        batch = clients[start:start + BATCH_SIZE]
+        codes = logic.allocate_client_codes(session, [(*client, None) for client in batch], username="seed")
+        rows = [
+            {"client_name": name, "client_code": code, "misc_info": misc, "created_by": "seed"}
+            for (name, _, _, misc), code in zip(batch, codes)
+        ]
+        ids.extend(session.execute(
+            insert(models.Client).returning(models.Client.client_id, models.Client.client_code,
+                                            sort_by_parameter_order=True),
+            rows
+        ).all())
+        session.commit()
+    return ids
+
+
+def seed_projects(session, rows, clients, client_ids, run_id, rng):
+    weights = list(itertools.accumulate(1 / (rank + 1) ** ZIPF_EXPONENT for rank in range(len(clients))))
+    for start in range(0, rows, BATCH_SIZE):
+        indexes = range(start, min(rows, start + BATCH_SIZE))
+        owners = rng.choices(range(len(clients)), cum_weights=weights, k=len(indexes))
+        project_ids = session.execute(
+            insert(models.Project).returning(models.Project.project_id, sort_by_parameter_order=True),
+            [{"project_name": f"{run_id} Project {i}", "show_code": f"{run_id}-{i:07d}", "created_by": "seed"}
+             for i in indexes]
+        ).scalars().all()
+        session.execute(insert(models.Master), [
+            {
+                "client_name": clients[owner][0], "region": clients[owner][1], "territory": clients[owner][2],
+                "currency": "INR" if clients[owner][1] == "Domestic" else "USD",
+                "show_code": f"{run_id}-{i:07d}", "project_name": f"{run_id} Project {i}",
+                "misc_info": clients[owner][3], "client_id": client_ids[owner][0],
+                "client_code": client_ids[owner][1], "project_id": project_id,
+                "brand": rng.choice(BRANDS), "country": "India" if clients[owner][1] == "Domestic" else "US",
+                "creation_mode": "New Client" if rng.random() < 0.3 else "Existing Client",
+                "created_by": f"bench_user_{rng.randrange(BENCH_USERS)}",
+            }
+            for i, owner, project_id in zip(indexes, owners, project_ids)
+        ])
+        session.commit()
+        print(f"  {indexes.stop}/{rows} projects", end="\r", flush=True)
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=os.getenv("DATABASE_URL"), help="database URL (default: $DATABASE_URL)")
+    parser.add_argument("--scale", choices=SCALES, default="10k", help="master rows to add")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate every table first")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not args.url:
+        raise SystemExit("Give --url or set DATABASE_URL.")
+    engine = create_engine(args.url)
+    if args.reset:
+        models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    rng = random.Random(args.seed)
+
+    rows = SCALES[args.scale]
+    # Unique per run, so seeding twice adds to the data instead of colliding with it
+    run_id = f"B{session.query(func.count(models.Project.project_id)).scalar():x}"
+    start = time.perf_counter()
+    seed_users(session)
+    clients = make_clients(max(1, rows // PROJECTS_PER_CLIENT), run_id, rng)
+    client_ids = seed_clients(session, clients)
+    print(f"{len(clients)} clients in {time.perf_counter() - start:.1f}s")
+    seed_projects(session, rows, clients, client_ids, run_id, rng)
+    print(f"{engine.dialect.name}: seeded {rows} projects in {time.perf_counter() - start:.1f}s "
+          f"({engine.url}); users bench_user_0..{BENCH_USERS - 1} / {BENCH_PASSWORD}")
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
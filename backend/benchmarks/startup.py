@@ -0,0 +1,73 @@
+"""
+Startup-time benchmark.
+
+Measures, over several fresh processes, how long `import app.main` takes and
+how long a uvicorn worker takes from spawn to answering its first request
+(GET /api/health). Run it once per DB_SCHEMA_MODE to compare create_all
+against the Alembic revision check.
+
+Usage:
+    DATABASE_URL=postgresql://... DB_SCHEMA_MODE=check python -m benchmarks.startup --runs 5
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_PROBE = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_time():
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1]) * 1000
+
+
+def time_to_first_request(timeout):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.01)
+        raise SystemExit(f"Server did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    imports = [import_time() for _ in range(args.runs)]
+    first_requests = [time_to_first_request(args.timeout) for _ in range(args.runs)]
+    print(f"DB_SCHEMA_MODE={os.getenv('DB_SCHEMA_MODE', '(default)')} runs={args.runs}")
+    print(f"import app.main:        median {statistics.median(imports):.0f} ms  max {max(imports):.0f} ms")
+    print(f"time to first request:  median {statistics.median(first_requests):.0f} ms  "
+          f"max {max(first_requests):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
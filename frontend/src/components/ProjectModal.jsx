@@ -63,102 +63,63 @@ export default function ProjectModal({ isOpen, onClose, project, onSave, mode =
         }
     }, [project, isOpen]);
 
-    // Fetch Client Names when opening in 'existing' mode
+    // Client name typeahead in 'existing' mode, debounced by prefix
     useEffect(() => {
         if (isOpen && mode === 'existing' && !project) {
             const fetchClients = async () => {
                 try {
-                    const res = await api.get("/marketing/clients/names");
-                    setClientNames(res.data.map(name => ({ value: name, label: name })));
-                } catch (err) {
-                    console.error("Failed to fetch client names", err);
-                }
-            };
-            fetchClients();
-        }
-    }, [isOpen, mode, project]);
-
-    // Fetch Misc Infos when Client Name changes in 'existing' mode
-    useEffect(() => {
-        if (isOpen && mode === 'existing' && formData.client_name && !project) {
-            const fetchInfos = async () => {
-                try {
-                    const res = await api.get("/marketing/clients/misc-infos", {
-                        params: { client_name: formData.client_name }
+                    const res = await api.get("/marketing/clients/names", {
+                        params: { prefix: formData.client_name, limit: 20 }
                     });
-                    setMiscInfos(res.data.map(info => ({ value: info, label: info })));
+                    setClientNames(res.data);
                 } catch (err) {
-                    console.error("Failed to fetch misc infos", err);
+                    console.error("Failed to fetch client names", err);
                 }
             };
-            fetchInfos();
-        } else {
-            setMiscInfos([]);
+            const timer = setTimeout(fetchClients, 200);
+            return () => clearTimeout(timer);
         }
     }, [formData.client_name, isOpen, mode, project]);
 
-    const fetchPreview = async () => {
-        if (!formData.client_name) return;
-        if (project) return;
+    // One call covers misc infos, autofill details and the client code preview
+    const fetchContext = async () => {
+        if (!formData.client_name || project) return;
 
         try {
             setPreviewError("");
-            const res = await api.get("/marketing/preview-client-code", {
+            const res = await api.get("/marketing/client-context", {
                 params: {
                     client_name: formData.client_name,
-                    region: formData.region,
-                    territory: formData.territory,
-                    misc_info: formData.misc_info
+                    misc_info: formData.misc_info,
+                    region: formData.region || undefined,
+                    territory: formData.territory || undefined
                 }
             });
-            setPreviewCode(res.data.client_code);
+            setMiscInfos(res.data.misc_infos.map(info => ({ value: info, label: info })));
+            if (res.data.region || res.data.territory || res.data.country) {
+                setFormData(prev => ({
+                    ...prev,
+                    region: res.data.region || prev.region,
+                    territory: res.data.territory || prev.territory,
+                    country: res.data.country || prev.country
+                }));
+            }
+            setPreviewCode(res.data.client_code || "");
         } catch (err) {
-            console.error("Preview failed", err);
+            console.error("Client lookup failed", err);
             setPreviewError("Failed to load preview");
         }
     };
 
     useEffect(() => {
+        if (!formData.client_name) setMiscInfos([]);
         const timeoutId = setTimeout(() => {
-            if (isOpen && !project) fetchPreview();
+            if (isOpen && !project) fetchContext();
         }, 500);
 
         return () => clearTimeout(timeoutId);
     }, [formData.client_name, formData.region, formData.territory, formData.misc_info, isOpen, project]);
 
-    // Autofill effect
-    useEffect(() => {
-        const fetchDetails = async () => {
-            if (!formData.client_name || !formData.misc_info || project) return;
-
-            try {
-                const res = await api.get("/marketing/client-details", {
-                    params: {
-                        client_name: formData.client_name,
-                        misc_info: formData.misc_info
-                    }
-                });
-
-                if (res.data && (res.data.region || res.data.territory || res.data.country)) {
-                    setFormData(prev => ({
-                        ...prev,
-                        region: res.data.region || prev.region,
-                        territory: res.data.territory || prev.territory,
-                        country: res.data.country || prev.country
-                    }));
-                }
-            } catch (err) {
-                console.error("Autofill failed", err);
-            }
-        };
-
-        const timeoutId = setTimeout(() => {
-            if (isOpen) fetchDetails();
-        }, 500);
-
-        return () => clearTimeout(timeoutId);
-    }, [formData.client_name, formData.misc_info, isOpen, project]);
-
     useEffect(() => {
         const validateFields = async () => {
             if (!formData.project_name && !formData.show_code) return;
@@ -258,14 +219,19 @@ export default function ProjectModal({ isOpen, onClose, project, onSave, mode =
                         <div className="grid grid-cols-1 md:grid-cols-2 gap-6">
                             {mode === 'existing' && !project ? (
                                 <>
-                                    <Select
+                                    <Input
                                         label="Client Name"
-                                        options={clientNames}
+                                        name="client_name"
+                                        list="client-name-options"
+                                        autoComplete="off"
                                         value={formData.client_name}
-                                        onChange={(e) => handleChange({ target: { name: "client_name", value: e.target.value } })}
+                                        onChange={handleChange}
                                         required
-                                        placeholder="Select Client"
+                                        placeholder="Start typing a client"
                                     />
+                                    <datalist id="client-name-options">
+                                        {clientNames.map(name => <option key={name} value={name} />)}
+                                    </datalist>
                                     <Select
                                         label="Misc Info"
                                         options={miscInfos}
@@ -335,7 +301,7 @@ export default function ProjectModal({ isOpen, onClose, project, onSave, mode =
                                     {project ? "Current Client Code" : "Realtime Client Code Preview"}
                                 </label>
                                 {!project && (
-                                    <button type="button" onClick={fetchPreview} className="text-xs text-primary hover:text-white flex items-center gap-1">
+                                    <button type="button" onClick={fetchContext} className="text-xs text-primary hover:text-white flex items-center gap-1">
                                         <RefreshCw size={12} /> Refresh
                                     </button>
                                 )}
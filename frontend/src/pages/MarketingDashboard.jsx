@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { useAuth } from "../context/AuthContext";
 import { useNavigate } from "react-router-dom";
 import { Button } from "../components/ui/Button";
@@ -18,86 +18,199 @@ export default function MarketingDashboard() {
 
     // State
     const [projects, setProjects] = useState([]);
-    const [allProjects, setAllProjects] = useState([]); // Store all projects for KPIs
+    const [nextCursor, setNextCursor] = useState(null);
+    const [changesCursor, setChangesCursor] = useState(null);
+    const [totalProjects, setTotalProjects] = useState(0);
+    const [facets, setFacets] = useState({ total: 0, clients: 0, brand: [], region: [], creation_mode: [] });
     const [clientTypeModalOpen, setClientTypeModalOpen] = useState(false);
     const [projectModalMode, setProjectModalMode] = useState('new');
     const [isModalOpen, setIsModalOpen] = useState(false);
     const [editingProject, setEditingProject] = useState(null);
     const [search, setSearch] = useState("");
+    const [debouncedSearch, setDebouncedSearch] = useState("");
     const [searchField, setSearchField] = useState("client_name");
     const [filterBrand, setFilterBrand] = useState(null);
     const [filterRegion, setFilterRegion] = useState(null);
     const [filterCreationMode, setFilterCreationMode] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [error, setError] = useState("");
+    const [exportJob, setExportJob] = useState(null);
 
-    // Initial Fetch
+    // Debounce search input so each keystroke doesn't hit the API
     useEffect(() => {
-        fetchProjects();
-    }, []);
+        const timeoutId = setTimeout(() => setDebouncedSearch(search), 300);
+        return () => clearTimeout(timeoutId);
+    }, [search]);
 
-    // Apply Filters
+    // Filtering is done server-side; refetch the first page whenever a filter changes
     useEffect(() => {
-        applyFilters();
-    }, [search, filterBrand, filterRegion, filterCreationMode, allProjects]);
+        fetchProjects();
+    }, [debouncedSearch, searchField, filterBrand, filterRegion, filterCreationMode]);
+
+    const getFilterParams = () => {
+        const params = { search_field: searchField };
+        if (debouncedSearch) params.search = debouncedSearch;
+        if (filterBrand) params.brand = filterBrand;
+        if (filterRegion) params.region = filterRegion;
+        if (filterCreationMode) params.creation_mode = filterCreationMode;
+        return params;
+    };
 
-    const fetchProjects = async () => {
+    // fresh=true bypasses the server's response cache, e.g. right after a save
+    const fetchProjects = async (fresh = false) => {
         try {
             setError("");
             setLoading(true);
-            const res = await api.get("/marketing/projects");
-            if (Array.isArray(res.data)) {
-                setAllProjects(res.data);
-                setProjects(res.data); // Initially, filtered list is same as all
-            } else {
-                setAllProjects([]);
-                setProjects([]);
-                console.error("API returned non-array data:", res.data);
-            }
+            const params = getFilterParams();
+            const headers = fresh ? { "Cache-Control": "no-cache" } : {};
+            // The facets query already counts the filtered rows; don't count them twice
+            const [pageRes, facetRes, changesRes] = await Promise.all([
+                api.get("/marketing/projects/page", { params: { ...params, count: "none" }, headers }),
+                api.get("/marketing/projects/facets", { params, headers }),
+                api.get("/marketing/projects/changes"),
+            ]);
+            setProjects(pageRes.data.items || []);
+            setChangesCursor(changesRes.data.cursor);
+            setNextCursor(pageRes.data.next_cursor);
+            setTotalProjects(facetRes.data.total || 0);
+            setFacets(facetRes.data);
         } catch (err) {
             console.error("Failed to fetch projects", err);
             setError("Failed to load projects. Please try again.");
-            setAllProjects([]);
             setProjects([]);
+            setNextCursor(null);
         } finally {
             setLoading(false);
         }
     };
 
-    const applyFilters = () => {
-        let filtered = [...allProjects];
-
-        if (search) {
-            const lowerSearch = search.toLowerCase();
-            filtered = filtered.filter(p => {
-                if (!p) return false;
-
-                let fieldValue = "";
-                switch (searchField) {
-                    case "client_name":
-                        fieldValue = p.client_name;
-                        break;
-                    case "client_code":
-                        fieldValue = p.client_code;
-                        break;
-                    case "project_name":
-                        fieldValue = p.project_name;
-                        break;
-                    case "show_code":
-                        fieldValue = p.show_code;
-                        break;
-                    default:
-                        fieldValue = p.client_name;
+    // Client-side twin of the server's dashboard filters, for rows merged in by syncChanges
+    const matchesFilters = (project) => {
+        if (debouncedSearch && !(project[searchField] || "").toLowerCase().includes(debouncedSearch.toLowerCase())) return false;
+        if (filterBrand && project.brand !== filterBrand) return false;
+        if (filterRegion && project.region !== filterRegion) return false;
+        if (filterCreationMode && project.creation_mode !== filterCreationMode) return false;
+        return true;
+    };
+
+    const mergeProjects = (items) => {
+        const changed = new Map(items.map(p => [p.master_id, p]));
+        setProjects(prev => {
+            // Rows older than the loaded pages show up on "Load more" instead
+            const oldest = prev.length ? prev[prev.length - 1].master_id : null;
+            const inRange = (p) => nextCursor === null || oldest === null || p.master_id >= oldest;
+            const kept = prev.filter(p => !changed.has(p.master_id));
+            const merged = [...changed.values()].filter(p => matchesFilters(p) && inRange(p));
+            return [...kept, ...merged].sort((a, b) => b.master_id - a.master_id);
+        });
+    };
+
+    // After a save, fetch only the rows changed since the last sync and merge them in
+    const syncChanges = async () => {
+        if (!changesCursor) return fetchProjects(true);
+        try {
+            const [changesRes, facetRes] = await Promise.all([
+                api.get("/marketing/projects/changes", { params: { since: changesCursor } }),
+                api.get("/marketing/projects/facets", { params: getFilterParams(), headers: { "Cache-Control": "no-cache" } }),
+            ]);
+            if (changesRes.data.truncated) return fetchProjects(true);
+            mergeProjects(changesRes.data.items);
+            setChangesCursor(changesRes.data.cursor);
+            setTotalProjects(facetRes.data.total);
+            setFacets(facetRes.data);
+        } catch (err) {
+            console.error("Failed to sync changes", err);
+            fetchProjects(true);
+        }
+    };
+
+    // Live updates from other users. Pushed rows are merged right away; counts are
+    // refreshed once things settle, and bulk changes are pulled through syncChanges.
+    const facetTimerRef = useRef(null);
+    const handleEventRef = useRef(null);
+    handleEventRef.current = (type, data) => {
+        if (type === "changed") {
+            syncChanges();
+            return;
+        }
+        mergeProjects([data]);
+        clearTimeout(facetTimerRef.current);
+        facetTimerRef.current = setTimeout(async () => {
+            try {
+                const res = await api.get("/marketing/projects/facets", { params: getFilterParams() });
+                setTotalProjects(res.data.total);
+                setFacets(res.data);
+            } catch (err) {
+                console.error("Failed to refresh counts", err);
+            }
+        }, 1000);
+    };
+
+    useEffect(() => {
+        // fetch rather than EventSource, which cannot send the Authorization header
+        const controller = new AbortController();
+        let retryTimer;
+        const connect = async () => {
+            try {
+                const res = await fetch(`${api.defaults.baseURL}/marketing/projects/events`, {
+                    headers: { Authorization: `Bearer ${localStorage.getItem("token")}` },
+                    signal: controller.signal,
+                });
+                if (!res.ok || !res.body) throw new Error(`Event stream failed: ${res.status}`);
+                const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+                let buffer = "";
+                for (;;) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffer += value;
+                    let end;
+                    while ((end = buffer.indexOf("\n\n")) !== -1) {
+                        const block = buffer.slice(0, end);
+                        buffer = buffer.slice(end + 2);
+                        let type = "message";
+                        let data = "";
+                        for (const line of block.split("\n")) {
+                            if (line.startsWith("event: ")) type = line.slice(7);
+                            else if (line.startsWith("data: ")) data += line.slice(6);
+                        }
+                        if (data) handleEventRef.current(type, JSON.parse(data));
+                    }
                 }
+            } catch (err) {
+                if (controller.signal.aborted) return;
+                console.error("Project event stream disconnected", err);
+            }
+            if (controller.signal.aborted) return;
+            // Ended (e.g. dropped for falling behind): reconnect and catch up on what was missed
+            retryTimer = setTimeout(() => {
+                connect();
+                handleEventRef.current("changed", null);
+            }, 3000);
+        };
+        connect();
+        return () => {
+            controller.abort();
+            clearTimeout(retryTimer);
+            clearTimeout(facetTimerRef.current);
+        };
+    }, []);
 
-                return fieldValue && typeof fieldValue === 'string' && fieldValue.toLowerCase().includes(lowerSearch);
+    const fetchMore = async () => {
+        if (nextCursor === null || loadingMore) return;
+        try {
+            setLoadingMore(true);
+            const res = await api.get("/marketing/projects/page", {
+                params: { ...getFilterParams(), cursor: nextCursor }
             });
+            setProjects(prev => [...prev, ...(res.data.items || [])]);
+            setNextCursor(res.data.next_cursor);
+        } catch (err) {
+            console.error("Failed to fetch more projects", err);
+            setError("Failed to load more projects. Please try again.");
+        } finally {
+            setLoadingMore(false);
         }
-        if (filterBrand) filtered = filtered.filter(p => p && p.brand === filterBrand);
-        if (filterRegion) filtered = filtered.filter(p => p && p.region === filterRegion);
-        if (filterCreationMode) filtered = filtered.filter(p => p && p.creation_mode === filterCreationMode);
-
-        setProjects(filtered);
     };
 
     const handleLogout = () => {
@@ -112,7 +225,7 @@ export default function MarketingDashboard() {
             } else {
                 await api.post("/marketing/projects", projectData);
             }
-            fetchProjects(); // Re-fetch to get updated list
+            syncChanges(); // Merge in what changed instead of re-fetching the list
             setIsModalOpen(false);
             setEditingProject(null);
         } catch (err) {
@@ -138,64 +251,42 @@ export default function MarketingDashboard() {
         setIsModalOpen(true);
     };
 
+    // The export runs as a background job on the server; poll it, then download the file
     const handleExport = async () => {
+        if (exportJob) return;
         try {
-            const response = await api.get("/marketing/projects/export", {
+            let { data: job } = await api.post("/marketing/jobs/export", null, { params: { format: 'csv' } });
+            setExportJob(job);
+            while (job.status === 'queued' || job.status === 'running') {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                ({ data: job } = await api.get(`/marketing/jobs/${job.job_id}`));
+                setExportJob(job);
+            }
+            if (job.status !== 'succeeded') {
+                throw new Error(job.error || 'Export failed');
+            }
+            const response = await api.get(`/marketing/jobs/${job.job_id}/download`, {
                 responseType: 'blob',
             });
             const url = window.URL.createObjectURL(new Blob([response.data]));
             const link = document.createElement('a');
             link.href = url;
-            link.setAttribute('download', 'projects.csv');
+            link.setAttribute('download', job.artifact_name || 'projects.csv');
             document.body.appendChild(link);
             link.click();
+            link.remove();
+            window.URL.revokeObjectURL(url);
         } catch (err) {
             console.error("Export failed", err);
+        } finally {
+            setExportJob(null);
         }
     };
 
-    // Helper to calculate counts for filter buttons (Faceted Search Logic)
-    // Calculates how many results would exist if we selected a specific filter value,
-    // respecting all OTHER currently active filters.
+    // Faceted counts come from the server: each facet respects every filter except its own
     const getFilteredCount = (field, value) => {
-        if (!allProjects) return 0;
-        return allProjects.filter(p => {
-            if (!p) return false; // Safety check
-
-            // 1. Search Filter
-            if (search) {
-                const lowerSearch = search.toLowerCase();
-                let fieldValue = "";
-                switch (searchField) {
-                    case "client_name":
-                        fieldValue = p.client_name;
-                        break;
-                    case "client_code":
-                        fieldValue = p.client_code;
-                        break;
-                    case "project_name":
-                        fieldValue = p.project_name;
-                        break;
-                    case "show_code":
-                        fieldValue = p.show_code;
-                        break;
-                    default:
-                        fieldValue = p.client_name;
-                }
-
-                if (!fieldValue || typeof fieldValue !== 'string' || !fieldValue.toLowerCase().includes(lowerSearch)) return false;
-            }
-
-            // 2. Apply all OTHER filters (skip the field we are currently counting for)
-            if (field !== 'brand' && filterBrand && p.brand !== filterBrand) return false;
-            if (field !== 'region' && filterRegion && p.region !== filterRegion) return false;
-            if (field !== 'creation_mode' && filterCreationMode && p.creation_mode !== filterCreationMode) return false;
-
-            // 3. Match the specific value for the field we are counting
-            if (p[field] !== value) return false;
-
-            return true;
-        }).length;
+        const entry = (facets[field] || []).find(f => f.value === value);
+        return entry ? entry.count : 0;
     };
 
     return (
@@ -244,14 +335,14 @@ export default function MarketingDashboard() {
                     <motion.div initial={{ opacity: 0, y: 20 }} animate={{ opacity: 1, y: 0 }} transition={{ delay: 0.05 }} className="glass-panel p-5 rounded-2xl relative overflow-hidden group">
                         <div className="absolute top-0 right-0 w-20 h-20 bg-emerald-500/10 rounded-bl-full -mr-4 -mt-4 transition-all group-hover:bg-emerald-500/20"></div>
                         <h3 className="text-gray-400 text-xs font-medium mb-1 uppercase tracking-wider">Total Projects</h3>
-                        <div className="text-3xl font-bold text-white">{(projects || []).length}</div>
+                        <div className="text-3xl font-bold text-white">{totalProjects}</div>
                     </motion.div>
 
                     {/* Card 2: Total Clients */}
                     <motion.div initial={{ opacity: 0, y: 20 }} animate={{ opacity: 1, y: 0 }} transition={{ delay: 0.1 }} className="glass-panel p-5 rounded-2xl relative overflow-hidden group">
                         <div className="absolute top-0 right-0 w-20 h-20 bg-primary/20 rounded-bl-full -mr-4 -mt-4 transition-all group-hover:bg-primary/30"></div>
                         <h3 className="text-gray-400 text-xs font-medium mb-1 uppercase tracking-wider">Total Clients</h3>
-                        <div className="text-3xl font-bold text-white">{new Set((projects || []).filter(p => p && p.client_name).map(p => p.client_name)).size}</div>
+                        <div className="text-3xl font-bold text-white">{facets.clients}</div>
                     </motion.div>
 
                     {/* Card 3: Region Filter */}
@@ -305,8 +396,8 @@ export default function MarketingDashboard() {
                         <div className="absolute top-0 right-0 w-20 h-20 bg-purple-500/10 rounded-bl-full -mr-4 -mt-4 transition-all group-hover:bg-purple-500/20"></div>
                         <h3 className="text-gray-400 text-xs font-medium mb-2 uppercase tracking-wider">Brands</h3>
                         <div className="flex flex-wrap gap-2 max-h-20 overflow-y-auto custom-scrollbar">
-                            {/* Get unique brands from ALL projects, but count based on current filters */}
-                            {Array.from(new Set((allProjects || []).filter(p => p).map(p => p.brand || "Unknown"))).map(brand => {
+                            {/* Brands present under the current filters, plus the selected one */}
+                            {Array.from(new Set([...(facets.brand || []).map(f => f.value), ...(filterBrand ? [filterBrand] : [])])).map(brand => {
                                 const count = getFilteredCount('brand', brand);
                                 // Only show brands that have at least 1 match in the current context (or are selected)
                                 if (count === 0 && filterBrand !== brand) return null;
@@ -355,8 +446,10 @@ export default function MarketingDashboard() {
                         </div>
                     </div>
                     <div className="flex gap-3 w-full md:w-auto">
-                        <Button variant="secondary" onClick={handleExport} className="shadow-none bg-dark-800 hover:bg-dark-700 border-white/5">
-                            <Download size={18} /> Export
+                        <Button variant="secondary" onClick={handleExport} disabled={!!exportJob} className="shadow-none bg-dark-800 hover:bg-dark-700 border-white/5">
+                            <Download size={18} /> {exportJob
+                                ? `Exporting${exportJob.total ? ` ${Math.min(100, Math.round(100 * exportJob.progress / exportJob.total))}%` : '...'}`
+                                : 'Export'}
                         </Button>
                         <Button onClick={handleCreate} className="shadow-lg shadow-primary/20">
                             <Plus size={18} /> New Project
@@ -419,6 +512,13 @@ export default function MarketingDashboard() {
                             </tbody>
                         </table>
                     </div>
+                    {!loading && nextCursor !== null && (
+                        <div className="flex justify-center py-4 border-t border-white/5">
+                            <Button variant="ghost" onClick={fetchMore} disabled={loadingMore} className="text-gray-400 hover:text-white hover:bg-white/10">
+                                {loadingMore ? "Loading..." : `Load more (${projects.length} of ${totalProjects})`}
+                            </Button>
+                        </div>
+                    )}
                 </motion.div>
             </main>
 